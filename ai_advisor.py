@@ -0,0 +1,205 @@
+"""
+AI 导师 / AI 教研建议：提示词构造、持久化缓存与全年级批量预生成
+
+- 缓存键只取决于 (模型, 系统提示, 提示词)；知识点组合相同的学生共用一条建议，存在本地 SQLite
+- 批量预生成：提示词去重、跳过已缓存的，有限并发调用接口，限流/5xx 按指数退避重试
+- 流式输出：相同提示词的并发请求共享同一条上游流，完整结果写入缓存
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MODEL = "deepseek-chat"
+STUDENT_SYSTEM = "你是专业AI导师。"
+TEACHER_SYSTEM = "你是教研专家AI。"
+
+
+def _retryable():
+    # 限流、网络抖动、服务端 5xx 才值得重试；鉴权/参数错误重试也没用
+    import openai
+    return (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def student_prompt(subject, weak_points, strong_points):
+    # 提示词里不放姓名：知识点组合相同的学生共用同一条缓存
+    return f"你是拥有20年经验的高中{subject}教师。一位学生的优势：{strong_points}。薄弱：{weak_points}。请写约300字的个性化鼓励和提分计划。"
+
+
+def teacher_prompt(subject, weak_points_list):
+    return f"你是教研员。高三年级{subject}失分严重的共性薄弱点是：{weak_points_list}。请给老师们写约300字的讲评课教研建议。"
+
+
+def cache_key(system, prompt, model=MODEL):
+    return hashlib.sha256(f"{model}\x00{system}\x00{prompt}".encode('utf-8')).hexdigest()
+
+
+class AdviceCache:
+    """按提示词内容寻址的建议缓存 (SQLite，多线程/多进程安全)"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS advice (key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        # Streamlit 每次重跑都换线程，连接不跨线程复用，用完即关
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT text FROM advice WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, text):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO advice (key, text, created_at) VALUES (?, ?, ?)", (key, text, time.time()))
+
+
+def make_client(api_key, base_url):
+    import openai
+    return openai.OpenAI(api_key=api_key, base_url=base_url)
+
+
+class _SharedStream:
+    """一条上游流的已到达片段；多个读者各自从头读取，未到达时等待"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def append(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done, self.error = True, error
+            self._cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self.chunks) and not self.done:
+                    self._cond.wait()
+                new = self.chunks[i:]
+                done, error = self.done, self.error
+            i += len(new)
+            yield from new
+            if done and i >= len(self.chunks):
+                if error is not None: raise error
+                return
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def _pump(client, cache, key, system, prompt, model, shared):
+    t0 = time.perf_counter()
+    try:
+        stream = client.chat.completions.create(model=model, messages=[{"role": "system", "content": system}, {"role": "user", "content": prompt}], stream=True)
+        for event in stream:
+            if event.choices and event.choices[0].delta.content:
+                if not shared.chunks: metrics.registry.observe('ai.stream.first_token', time.perf_counter() - t0)
+                shared.append(event.choices[0].delta.content)
+        metrics.registry.observe('ai.stream.total', time.perf_counter() - t0)
+        cache.put(key, "".join(shared.chunks))
+        shared.finish()
+    except Exception as e:
+        shared.finish(e)
+    finally:
+        with _streams_lock:
+            _streams.pop(key, None)
+
+
+def stream_complete(client, cache, system, prompt, model=MODEL):
+    """
+    逐段产出建议文本。缓存命中时一次性返回全文；否则加入 (或发起) 该提示词的上游流。
+    上游流在后台线程中读取，页面中途刷新或离开也会读完并写入缓存。
+    """
+    key = cache_key(system, prompt, model)
+    with _streams_lock:
+        # 查缓存与登记上游流在同一把锁里：_pump 先写缓存、再在锁里注销，任何时刻两者必有其一命中，不会重复发起
+        text = cache.get(key)
+        shared = _streams.get(key) if text is None else None
+        if text is None and shared is None:
+            shared = _streams[key] = _SharedStream()
+            threading.Thread(target=_pump, args=(client, cache, key, system, prompt, model, shared), daemon=True).start()
+    metrics.registry.cache_event('ai_advice', hit=text is not None)
+    if text is not None:
+        yield text
+        return
+    yield from shared
+
+
+async def _complete_with_retry(client, system, prompt, model, sem, retries, backoff):
+    retryable = _retryable()
+    for attempt in range(retries + 1):
+        try:
+            async with sem:
+                with metrics.span('ai.batch.request'):
+                    res = await client.chat.completions.create(model=model, messages=[{"role": "system", "content": system}, {"role": "user", "content": prompt}])
+            return res.choices[0].message.content
+        except retryable as e:
+            if attempt == retries: raise
+            delay = backoff * (2 ** attempt) * (1 + random.random())
+            logger.info("AI request retry %d in %.1fs (%s)", attempt + 1, delay, e)
+            # 退避期间不占并发名额，其他提示词照常请求；醒来后重新排队
+            await asyncio.sleep(delay)
+
+
+async def _pregenerate(api_key, base_url, cache, jobs, model, concurrency, retries, backoff, on_progress):
+    sem = asyncio.Semaphore(concurrency)
+    summary = {'generated': 0, 'failed': 0}
+    done = 0
+
+    async def run(key, system, prompt):
+        nonlocal done
+        try:
+            cache.put(key, await _complete_with_retry(client, system, prompt, model, sem, retries, backoff))
+            summary['generated'] += 1
+        except Exception as e:
+            logger.warning("AI pregenerate failed: %s", e)
+            summary['failed'] += 1
+        done += 1
+        if on_progress: on_progress(done, len(jobs))
+
+    import openai
+    async with openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0) as client:
+        await asyncio.gather(*(run(*job) for job in jobs))
+    return summary
+
+
+def pregenerate(api_key, base_url, cache, prompts, model=MODEL, concurrency=8, retries=3, backoff=1.0, on_progress=None):
+    """
+    批量预生成。prompts 为 (系统提示, 提示词) 的可迭代对象，允许大量重复。
+    返回 {'total', 'unique', 'cached', 'generated', 'failed'}。
+    """
+    prompts = list(prompts)
+    unique = {cache_key(system, prompt, model): (system, prompt) for system, prompt in prompts}
+    jobs = [(key, system, prompt) for key, (system, prompt) in unique.items() if cache.get(key) is None]
+    summary = {'total': len(prompts), 'unique': len(unique), 'cached': len(unique) - len(jobs), 'generated': 0, 'failed': 0}
+    if jobs:
+        summary.update(asyncio.run(_pregenerate(api_key, base_url, cache, jobs, model, concurrency, retries, backoff, on_progress)))
+    return summary
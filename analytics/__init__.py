@@ -0,0 +1,18 @@
+"""
+考试学情分析核心 (纯计算，可单独导入做基准测试)
+
+只有 app.py 依赖 Streamlit；本包和 sheet_loader / snapshot_store / ai_advisor / metrics / charts / report_export 都不导入它。
+
+- schema: 成绩总表/明细表的列类型声明、读入即类型化的解析函数与校验摘要
+- sheets: 表格结构识别 (姓名/考号列、明细表题目列) 与学生哈希索引
+- knowledge: 学生 × 知识点掌握率矩阵、全年级知识点掌握率
+- items: 试题质量分析 (难度、区分度、点二列相关、得分分布、各班难度)
+- ranks: 名次索引 (年级/班级名次、百分位、前 N 名，二分查找)
+- scores: 学生各科得分、班级均分、看板聚合 (均分/分数分布)、光荣榜
+"""
+from .schema import SCHEMA_VERSION, parse_sheet, apply_score_schema, apply_detail_schema
+from .sheets import question_columns, build_student_index
+from .knowledge import build_knowledge_map, knowledge_point_mastery, weak_strong_sets
+from .items import item_analysis
+from .ranks import RankIndex
+from .scores import student_subject_scores, numeric_subjects, class_means, histogram_bins, score_aggregates, top_names, fmt_number, banner_html
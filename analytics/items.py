@@ -0,0 +1,109 @@
+"""
+单科明细表的试题质量分析 (经典测量理论)
+
+对学生 × 题目得分矩阵做一次批量数组运算，得到每道题的：
+- 难度：得分率 (作答学生的平均分 / 满分)，与知识点掌握率口径一致
+- 区分度：按总分取前 27% 与后 27% 两组，两组得分率之差
+- 点二列相关：题目得分与"总分减去本题"的相关系数 (校正后的题总相关)
+- 得分分布：零分 / 未过半 / 过半 / 满分 / 缺考 的人数占比
+- 各班难度：班级 × 题目的得分率矩阵
+- 提示：按常用经验阈值标出偏难/偏易、区分度偏低、与总分负相关的题
+
+区分度和相关系数把缺考按 0 分计 (与学生诊断页一致)。
+"""
+import numpy as np
+import pandas as pd
+
+from .schema import numeric_block
+from .sheets import question_columns
+
+BANDS = ['零分', '未过半', '过半', '满分', '缺考']
+
+
+def _class_column(df_diag):
+    for i, col in enumerate(df_diag.columns):
+        head = str(col[0]) if isinstance(col, tuple) else str(col)
+        if '班级' in head: return i
+    return -1
+
+
+def _flag(difficulty, discrimination, point_biserial):
+    notes = []
+    if difficulty < 0.3: notes.append('偏难')
+    elif difficulty > 0.9: notes.append('偏易')
+    if discrimination < 0.2: notes.append('区分度偏低')
+    if point_biserial < 0: notes.append('与总分负相关')
+    return '、'.join(notes)
+
+
+def item_analysis(df_diag, group_frac=0.27):
+    """
+    返回 {'items': 逐题统计 DataFrame, 'distribution': 逐题得分分布 DataFrame,
+          'classes': 班级列表, 'class_difficulty': 班级 × 题目得分率 ndarray}；
+    没有题目列时 items 为空表。
+    """
+    if df_diag is None: return None
+    questions = question_columns(df_diag)
+    labels = [str(df_diag.columns[q[0]][0]).strip() for q in questions]
+    if not questions:
+        return {'items': pd.DataFrame(columns=['题号', '知识点', '满分', '作答人数', '难度', '区分度', '点二列相关', '提示']),
+                'distribution': pd.DataFrame(columns=['题号'] + BANDS), 'classes': [], 'class_difficulty': np.zeros((0, 0))}
+    full = np.asarray([q[2] for q in questions], dtype=float)
+    # 整个函数只保留一块 n × q 的 float64 (缺考置 0) 和一块布尔缺考掩码，其余统计都由列和、矩阵-向量乘得到
+    x = numeric_block(df_diag, [q[0] for q in questions])
+    missing = np.isnan(x)
+    if not x.flags.writeable: x = x.copy()  # 写时复制下 to_numpy 可能交出共享表的只读视图
+    x[missing] = 0.0
+    n, n_q = x.shape
+    n_missing = missing.sum(axis=0)
+    count = n - n_missing
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sx = x.sum(axis=0)
+        difficulty = sx / count / full
+
+        # 前后 27% 分组 (同分按表中顺序，结果稳定)：用 0/1 选择向量乘矩阵求组内列和，不复制行
+        total = x.sum(axis=1)
+        k = max(1, int(np.ceil(n * group_frac))) if n else 0
+        order = np.argsort(-total, kind='stable')
+        if k:
+            top, bottom = np.zeros(n), np.zeros(n)
+            top[order[:k]], bottom[order[-k:]] = 1.0, 1.0
+            discrimination = (top @ x - bottom @ x) / k / full
+        else: discrimination = np.full(n_q, np.nan)
+
+        # 校正题总相关：本题与 (总分 - 本题) 的 Pearson 相关，全部由列和得到
+        # cov(x, T - x) = cov(x, T) - var(x)，var(T - x) = var(T) - 2 cov(x, T) + var(x)
+        var_x = np.einsum('ij,ij->j', x, x) / n - (sx / n) ** 2
+        cov_xt = (total @ x) / n - (sx / n) * total.mean()
+        var_t = total.var()
+        point_biserial = (cov_xt - var_x) / np.sqrt(var_x * (var_t - 2 * cov_xt + var_x))
+
+    # 得分分布：逐档做一次比较计数 (缺考已置 0，先算进 <= 0 再扣掉)，不构造整块档位矩阵
+    le_zero = (x <= 0).sum(axis=0)
+    zero = le_zero - n_missing
+    below_half = (x < 0.5 * full).sum(axis=0) - le_zero
+    full_marks = (x >= full).sum(axis=0)
+    dist = np.stack([zero, below_half, count - zero - below_half - full_marks, full_marks, n_missing], axis=1) / max(n, 1)
+
+    items = pd.DataFrame({
+        '题号': labels, '知识点': [q[1] for q in questions], '满分': full, '作答人数': count,
+        '难度': np.round(difficulty, 3), '区分度': np.round(discrimination, 3), '点二列相关': np.round(point_biserial, 3),
+    })
+    items['提示'] = [_flag(d, dis, r) for d, dis, r in zip(difficulty.tolist(), discrimination.tolist(), point_biserial.tolist())]
+    distribution = pd.DataFrame(np.round(dist * 100, 1), columns=BANDS)
+    distribution.insert(0, '题号', labels)
+
+    # 班级 × 题目：0/1 归属矩阵乘法得到各班每题的得分和；作答人数 = 班级人数 - 班内缺考数
+    cls_pos = _class_column(df_diag)
+    classes, class_difficulty = [], np.zeros((0, n_q))
+    if cls_pos != -1:
+        cls = df_diag.iloc[:, cls_pos].astype(str).str.strip()
+        codes, classes = pd.factorize(cls, sort=True)
+        member = np.zeros((len(classes), n))
+        member[codes[codes >= 0], np.flatnonzero(codes >= 0)] = 1.0
+        answered = member.sum(axis=1)[:, None] - np.stack([missing[codes == c].sum(axis=0) for c in range(len(classes))]) if len(classes) else np.zeros((0, n_q))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            class_difficulty = np.round((member @ x) / answered / full, 3)
+        classes = classes.tolist()
+    return {'items': items, 'distribution': distribution, 'classes': classes, 'class_difficulty': class_difficulty}
@@ -0,0 +1,59 @@
+"""知识点维度的统计：单个学生的掌握率与班级平均、全年级共性薄弱点"""
+import numpy as np
+import pandas as pd
+
+from .schema import numeric_block
+from .sheets import question_columns
+
+
+def _score_matrix(df_diag, questions):
+    return numeric_block(df_diag, [q[0] for q in questions])
+
+
+def build_knowledge_map(df_diag):
+    """
+    单科明细表 -> {'kps': 知识点列表, 'my_rates': 学生 × 知识点掌握率, 'avg_rates': 班级平均掌握率}
+    掌握率为百分比并保留一位小数；学生缺考的题按 0 分计。
+    """
+    if df_diag is None: return None
+    questions = question_columns(df_diag)
+    kps = list(dict.fromkeys(q[1] for q in questions))
+    if not kps: return {'kps': [], 'my_rates': np.zeros((len(df_diag), 0)), 'avg_rates': np.zeros(0)}
+    # 题目 -> 知识点 的 0/1 归属矩阵，分组求和即一次矩阵乘法
+    kp_code = {kp: k for k, kp in enumerate(kps)}
+    member = np.zeros((len(questions), len(kps)))
+    member[np.arange(len(questions)), [kp_code[q[1]] for q in questions]] = 1.0
+    scores = _score_matrix(df_diag, questions)
+    kp_full = np.asarray([q[2] for q in questions]) @ member
+    counts = (~np.isnan(scores)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        q_mean = np.nansum(scores, axis=0) / counts
+        my_rates = np.round(np.nan_to_num(scores) @ member / kp_full * 100, 1)
+        avg_rates = np.round(q_mean @ member / kp_full * 100, 1)
+    return {'kps': kps, 'my_rates': my_rates, 'avg_rates': avg_rates}
+
+
+def knowledge_point_mastery(df_diag):
+    """全年级各知识点掌握率 (该知识点下各题得分率的平均)，按掌握率升序的 DataFrame[知识点, 掌握率]"""
+    if df_diag is None: return None
+    questions = question_columns(df_diag)
+    if not questions: return pd.DataFrame(columns=["知识点", "掌握率"])
+    scores = _score_matrix(df_diag, questions)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        q_rate = np.nansum(scores, axis=0) / (~np.isnan(scores)).sum(axis=0) / np.asarray([q[2] for q in questions])
+    k_stats = {}
+    for (_, kp, _), rate in zip(questions, q_rate.tolist()):
+        k_stats.setdefault(kp, []).append(rate)
+    k_final = [{"知识点": kp, "掌握率": round(sum(rates)/len(rates)*100, 1)} for kp, rates in k_stats.items()]
+    return pd.DataFrame(k_final).sort_values("掌握率")
+
+
+def weak_strong_sets(kmap):
+    """全年级去重后的 (薄弱知识点串, 优势知识点串)，判定规则与深度诊断页一致"""
+    kps = kmap['kps']
+    sets = set()
+    for weak_row in (kmap['my_rates'] < kmap['avg_rates']).tolist():
+        w_str = "、".join(kp for kp, w in zip(kps, weak_row) if w) or "无"
+        s_str = "、".join(kp for kp, w in zip(kps, weak_row) if not w) or "无"
+        sets.add((w_str, s_str))
+    return sorted(sets)
@@ -0,0 +1,84 @@
+"""名次索引：每个数据版本排序一次，之后的年级/班级名次、百分位、前 N 名查询都是二分查找或现成切片"""
+import numpy as np
+import pandas as pd
+
+from .schema import numeric
+from .scores import PK_EXCLUDE
+
+
+def _readonly(arr):
+    arr.flags.writeable = False
+    return arr
+
+
+class RankIndex:
+    """
+    成绩总表的名次索引。对总分和各科分别保存：
+    - 全年级升序分数数组，以及按班级切分的升序分数数组 (用于二分求名次/百分位)
+    - 降序前 head 名的行号 (同分按表中顺序)
+    名次按"比我高的人数 + 1"计，同分同名次；缺考 (NaN) 不参与排名。
+    """
+
+    def __init__(self, df, head=10):
+        cols = [c for c in df.columns if c not in PK_EXCLUDE and not str(c).startswith('Unnamed') and pd.api.types.is_numeric_dtype(numeric(df[c]))]
+        if '总分' in df.columns: cols = ['总分'] + cols
+        classes = df['班级'].astype(str).str.strip().to_numpy() if '班级' in df.columns else None
+        self.columns = []
+        self._sorted, self._by_class, self._heads = {}, {}, {}
+        for c in cols:
+            values = numeric(df[c]).to_numpy(dtype=float, na_value=np.nan)
+            valid = ~np.isnan(values)
+            if not valid.any(): continue
+            self.columns.append(c)
+            self._sorted[c] = _readonly(np.sort(values[valid]))
+            order = np.flatnonzero(valid)[np.argsort(-values[valid], kind='stable')]
+            self._heads[c] = _readonly(order[:head])
+            if classes is not None:
+                self._by_class[c] = {k: _readonly(np.sort(values[valid & (classes == k)])) for k in pd.unique(classes[valid])}
+        self._names = df['姓名'].astype(str).str.strip().to_numpy() if '姓名' in df.columns else None
+
+    @staticmethod
+    def _rank(sorted_scores, score):
+        return len(sorted_scores) - int(np.searchsorted(sorted_scores, score, side='right')) + 1
+
+    def size(self, col, cls=None):
+        arr = self._sorted.get(col) if cls is None else self._by_class.get(col, {}).get(str(cls).strip())
+        return 0 if arr is None else len(arr)
+
+    def grade_rank(self, col, score):
+        """全年级名次；该列不存在或分数缺失时为 None"""
+        if col not in self._sorted or pd.isna(score): return None
+        return self._rank(self._sorted[col], float(score))
+
+    def class_rank(self, col, cls, score):
+        arr = self._by_class.get(col, {}).get(str(cls).strip())
+        if arr is None or pd.isna(score): return None
+        return self._rank(arr, float(score))
+
+    def percentile(self, col, score):
+        """全年级中分数严格低于该分数的人数占比 (百分比，一位小数)"""
+        arr = self._sorted.get(col)
+        if arr is None or pd.isna(score): return None
+        return round(int(np.searchsorted(arr, float(score), side='left')) / len(arr) * 100, 1)
+
+    def top(self, col, n=5):
+        """该列前 n 名的行号 (n 不超过建索引时的 head)"""
+        return self._heads.get(col, np.zeros(0, dtype=int))[:n]
+
+    def top_score(self, col):
+        arr = self._sorted.get(col)
+        return arr[-1] if arr is not None else None
+
+    def top_names(self, n=5, col='总分'):
+        if self._names is None: return []
+        return self._names[self.top(col, n)].tolist()
+
+    def standing(self, stu_data):
+        """某个学生在总分和各科上的 [(科目, 得分, 年级名次, 班级名次, 超过全年级百分比)]，缺考的科目跳过"""
+        cls = stu_data.get('班级')
+        rows = []
+        for c in self.columns:
+            score = pd.to_numeric(stu_data.get(c), errors='coerce')
+            if pd.isna(score): continue
+            rows.append((c, score, self.grade_rank(c, score), self.class_rank(c, cls, score) if cls is not None else None, self.percentile(c, score)))
+        return rows
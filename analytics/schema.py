@@ -0,0 +1,99 @@
+"""
+成绩表结构声明与一次性类型化解析
+
+- 成绩总表 (单行表头)：姓名/考号/学号为字符串，班级为分类，名次类为整数，其余分数列为 float32
+- 单科明细表 (题号 / 知识点 / 满分 三行表头)：题目列为 float32，满分从第三行表头一次性取出，存进 df.attrs['questions']
+
+解析时把无法识别为数字的分数单元格汇总到 df.attrs['validation']，而不是悄悄变成 NaN。
+下游直接使用类型化后的列，不必每次重跑 pd.to_numeric。
+"""
+import numpy as np
+import pandas as pd
+
+from .sheets import question_columns
+
+# 结构或解析规则变化时递增，旧的本地快照随之失效
+SCHEMA_VERSION = 1
+
+ID_COLUMNS = ('姓名', '考号', '学号')
+CATEGORY_COLUMNS = ('班级',)
+INT_COLUMNS = ('序号', '排名', '班级排名', '年级排名')
+
+
+def _strip(raw):
+    return raw.str.strip().replace('', np.nan)
+
+
+def _to_number(raw):
+    """字符串列 -> (数值 Series, 填了内容却不是数字的掩码)"""
+    text = _strip(raw)
+    num = pd.to_numeric(text, errors='coerce')
+    return num, text.notna() & num.isna()
+
+
+def _issue(name, raw, bad):
+    return {'column': name, 'invalid': int(bad.sum()), 'examples': raw[bad].astype(str).head(3).tolist()}
+
+
+def _score_sheet_column(name, raw, issues):
+    if name in ID_COLUMNS: return _strip(raw)
+    if name in CATEGORY_COLUMNS: return _strip(raw).astype('category')
+    if name.startswith('Unnamed'): return _strip(raw)
+    num, bad = _to_number(raw)
+    if bad.sum() * 2 > _strip(raw).notna().sum():
+        return _strip(raw)  # 大部分不是数字：备注之类的文字列，原样保留
+    if bad.any(): issues.append(_issue(name, raw, bad))
+    if name in INT_COLUMNS and (num.dropna() % 1 == 0).all(): return num.astype('Int32')
+    return num.astype('float32')
+
+
+def apply_score_schema(df):
+    issues = []
+    cols = {i: _score_sheet_column(str(name), df.iloc[:, i], issues) for i, name in enumerate(df.columns)}
+    out = pd.DataFrame(cols).set_axis(df.columns, axis=1)
+    missing = [c for c in ('姓名',) if c not in df.columns] + ([] if {'考号', '学号'} & set(df.columns) else ['考号'])
+    out.attrs['schema'] = 'score'
+    out.attrs['validation'] = {'rows': len(out), 'missing': missing, 'invalid_cells': sum(i['invalid'] for i in issues), 'columns': issues}
+    return out
+
+
+def apply_detail_schema(df):
+    issues = []
+    questions = question_columns(df)
+    q_pos = {q[0] for q in questions}
+    cols = {}
+    for i, col in enumerate(df.columns):
+        head, raw = str(col[0]).strip(), df.iloc[:, i]
+        if i in q_pos:
+            num, bad = _to_number(raw)
+            if bad.any(): issues.append(_issue(head, raw, bad))
+            cols[i] = num.astype('float32')
+        elif any(k in head for k in CATEGORY_COLUMNS): cols[i] = _strip(raw).astype('category')
+        else: cols[i] = _strip(raw)
+    out = pd.DataFrame(cols).set_axis(df.columns, axis=1)
+    heads = [str(c[0]) for c in df.columns]
+    missing = [k for k, alts in (('姓名', ('姓名',)), ('考号', ('考号', '学号'))) if not any(a in h for h in heads for a in alts)]
+    out.attrs['schema'] = 'detail'
+    out.attrs['questions'] = [list(q) for q in questions]
+    out.attrs['validation'] = {'rows': len(out), 'missing': missing, 'invalid_cells': sum(i['invalid'] for i in issues), 'columns': issues}
+    return out
+
+
+def parse_sheet(source, header=0):
+    """按表头行数选择对应的结构声明，读入即类型化 (供 SheetLoader 作为解析函数)"""
+    multi = isinstance(header, (list, tuple))
+    df = pd.read_csv(source, header=list(header) if multi else header, dtype=str, on_bad_lines='skip')
+    return apply_detail_schema(df) if multi else apply_score_schema(df)
+
+
+def numeric(series):
+    """已类型化的分数列直接返回；未经 schema 解析的原始列才做一次转换"""
+    return series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
+
+
+def numeric_block(df, positions):
+    """按列位置取出分数矩阵 (float64)"""
+    block = df.iloc[:, positions]
+    if all(pd.api.types.is_numeric_dtype(t) for t in block.dtypes):
+        return block.to_numpy(dtype=float, na_value=np.nan)
+    return block.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
@@ -0,0 +1,88 @@
+"""成绩总表上的统计：学生各科得分、班级均分、分数分布、光荣榜"""
+import numpy as np
+import pandas as pd
+
+from .schema import numeric
+
+STUDENT_EXCLUDE = ['姓名', '考号', '学号', '班级', '总分', '班级排名', '年级排名', 'Unnamed', '序号']
+PK_EXCLUDE = ['姓名', '考号', '学号', '班级', '排名', '总分', '班级排名', '年级排名', '序号']
+
+
+def student_subject_scores(df, stu_data):
+    """某个学生有有效分数的科目列及其得分：[(科目, 得分)]"""
+    scores = []
+    for c in df.columns:
+        if c in STUDENT_EXCLUDE or str(c).startswith('Unnamed'): continue
+        v = stu_data[c] if pd.api.types.is_numeric_dtype(df[c]) else pd.to_numeric(stu_data[c], errors='coerce')
+        if pd.notna(v) and v >= 0: scores.append((c, v))
+    return scores
+
+
+def numeric_subjects(df, exclude=PK_EXCLUDE, complete=True):
+    """整列都是数值的科目列；complete=False 时允许缺考 (空/非数字单元格)，只要有有效分数即可"""
+    return [c for c in df.columns if c not in exclude and (numeric(df[c]).notna().all() if complete else numeric(df[c]).notna().any())]
+
+
+def class_means(df, cols):
+    """按班级求各列均分 (保留一位小数)，不修改传入的 DataFrame"""
+    # float32 分数列升到 float64 再求均值，避免累加误差影响一位小数
+    values = df[cols].apply(numeric).astype(float)
+    values.insert(0, '班级', df['班级'])
+    return values.groupby('班级', observed=True)[cols].mean().round(1).reset_index()
+
+
+def histogram_bins(values, nbins=15):
+    """
+    分数分布直方图的分箱：约 nbins 个等宽箱，箱宽取 1/2/2.5/5×10^k 的整齐值，区间左闭右开。
+    返回 {'edges': 箱边界, 'counts': 各箱人数, 'size': 箱宽}；只把分箱结果送到前端，不送全体原始分数。
+    """
+    v = numeric(values).dropna().to_numpy(dtype=float)
+    if not len(v): return {'edges': np.zeros(0), 'counts': np.zeros(0, dtype=int), 'size': 1.0}
+    lo, hi = v.min(), v.max()
+    raw = (hi - lo) / nbins or 1.0
+    mag = 10 ** np.floor(np.log10(raw))
+    size = float(next(m * mag for m in (1, 2, 2.5, 5, 10) if m * mag >= raw))
+    start = np.floor(lo / size) * size
+    edges = start + size * np.arange(int((hi - start) // size) + 2)
+    return {'edges': edges, 'counts': np.histogram(v, edges)[0], 'size': size}
+
+
+def score_aggregates(df, nbins=15):
+    """
+    成绩总表的看板聚合 (每个数据版本只算一次)：
+    {'subjects': 整列都是数值的科目, 'class_avg': 各班各科 (含有缺考的科目) 及总分的均分 (无班级列时为 None), 'hist': 总分分箱 (无总分列时为 None)}
+    序号、备注这类非分数列不参与均分。
+    """
+    cols = numeric_subjects(df, complete=False) + (['总分'] if '总分' in df.columns else [])
+    return {
+        'subjects': numeric_subjects(df),
+        'class_avg': class_means(df, cols) if '班级' in df.columns else None,
+        'hist': histogram_bins(df['总分'], nbins) if '总分' in df.columns else None,
+    }
+
+
+def top_names(df, n=5):
+    """总分前 n 名的姓名"""
+    if df is None or '总分' not in df.columns or '姓名' not in df.columns: return []
+    total = numeric(df['总分']).dropna()
+    return df.loc[total.sort_values(ascending=False).index[:n], '姓名'].astype(str).str.strip().tolist()
+
+
+def fmt_number(v, missing='N/A'):
+    """分数/名次的展示文本：整数不带小数点，float32 的尾差截到两位小数"""
+    if v is None or pd.isna(v): return missing
+    try: f = float(v)
+    except (TypeError, ValueError): return str(v)
+    return str(int(f)) if f.is_integer() else f"{round(f, 2):g}"
+
+
+def banner_html(top_physics, top_history):
+    str_p = f"🚀 理科前五：{'、'.join(top_physics)}" if top_physics else ""
+    str_h = f"🌟 文科前五：{'、'.join(top_history)}" if top_history else ""
+    if not (str_p or str_h):
+        return "🎉 欢迎使用英华学校高中部考试学情智能分析系统！ 🏆"
+    banner = "🎉 <b>成绩表彰光荣榜</b> 🏆<br>"
+    if str_p: banner += f"<span style='font-size: 16px; color: #D97706;'>{str_p}</span>"
+    if str_p and str_h: banner += "<br>"
+    if str_h: banner += f"<span style='font-size: 16px; color: #D97706;'>{str_h}</span>"
+    return banner
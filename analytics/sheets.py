@@ -0,0 +1,34 @@
+"""表格结构识别：成绩总表 (单行表头) 与单科明细表 (题号 / 知识点 / 满分 三行表头)"""
+
+
+def question_columns(df_diag):
+    """明细表中的题目列：[(列位置, 知识点, 满分)]，跳过姓名/考号等非题目列和满分无效的列"""
+    # 经 schema 解析的表已在读入时取出过满分，直接复用
+    if 'questions' in df_diag.attrs: return [tuple(q) for q in df_diag.attrs['questions']]
+    questions = []
+    for i, col in enumerate(df_diag.columns):
+        q_name, k_point = str(col[0]).strip(), str(col[1]).strip()
+        try: full = float(col[2])
+        except: full = 0
+        if '姓名' in q_name or '考号' in q_name or full <= 0: continue
+        questions.append((i, k_point, full))
+    return questions
+
+
+def build_student_index(df, multi_header=False):
+    """(姓名, 考号) -> 行号 的哈希索引；找不到姓名或考号列时返回空字典"""
+    if df is None: return None
+    name_idx, id_idx = -1, -1
+    for i, col in enumerate(df.columns):
+        head = str(col[0]) if isinstance(col, tuple) else str(col)
+        if multi_header:
+            if '姓名' in head: name_idx = i
+            if '考号' in head or '学号' in head: id_idx = i
+        else:
+            if head == '姓名': name_idx = i
+            if head == '考号' or (head == '学号' and id_idx == -1): id_idx = i
+    if name_idx == -1 or id_idx == -1: return {}
+    names = df.iloc[:, name_idx].astype(str).str.strip().tolist()
+    ids = df.iloc[:, id_idx].astype(str).str.strip().tolist()
+    # 倒序写入，重名重号时保留第一条记录
+    return dict(zip(zip(names[::-1], ids[::-1]), range(len(names) - 1, -1, -1)))
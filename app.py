@@ -1,10 +1,18 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
 from streamlit_option_menu import option_menu
-import openai
 import os
+from sheet_loader import SheetLoader, freeze
+from snapshot_store import SnapshotStore
+import ai_advisor
+import analytics
+import charts
+import report_export
+import metrics
+import time
+# plotly / openai 较重，只在真正画图、调用 AI 的分支里按需导入
+
+page_t0 = time.perf_counter()
 
 # ==============================================================================
 # 1. 页面基础配置 
@@ -35,73 +43,172 @@ try:
     }
     
     AI_API_KEY = st.secrets.get("DEEPSEEK_API_KEY", "")
+    AI_BASE_URL = st.secrets.get("AI_BASE_URL", "https://api.deepseek.com")
 except Exception as e:
     st.error("⚠️ 系统配置读取失败，请检查 Streamlit 后台的 Secrets 是否配置正确。")
     st.stop()
 
-if AI_API_KEY:
-    client = openai.OpenAI(api_key=AI_API_KEY, base_url="https://api.deepseek.com")
-else:
-    client = None
-
 # ==============================================================================
 # 🛠️ 核心数据加载与动态光荣榜计算
 # ==============================================================================
-@st.cache_data(ttl=600)
-def load_data(url, header_lines=0):
-    if not url or not url.strip(): return None
-    try: return pd.read_csv(url, header=header_lines, on_bad_lines='skip')
-    except: return None
+@st.cache_resource(show_spinner=False)
+def get_sheet_loader():
+    # 进程级单例：所有会话共享同一份表格快照，过期后后台条件请求刷新；重启时先读本地磁盘快照
+    # 解析时按 analytics.schema 一次性类型化 (考号为字符串、班级为分类、分数为 float32)，下游不再反复 to_numeric
+    store = SnapshotStore(os.environ.get("SHEET_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sheet_cache")), tag=analytics.SCHEMA_VERSION)
+    loader = SheetLoader(ttl=600, max_workers=8, store=store, parse=analytics.parse_sheet)
+    metrics.registry.gauge("sheet_memory_bytes", lambda: loader.footprint(configured_sheets()), "各张表快照的内存占用")
+    return loader
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_endpoint(port, host):
+    # 配置了 METRICS_PORT 时，每个进程起一个 Prometheus 抓取端点 /metrics；默认只监听本机，METRICS_HOST 可改
+    return metrics.registry.serve(port, host)
+
+if os.environ.get("METRICS_PORT"): start_metrics_endpoint(int(os.environ["METRICS_PORT"]), os.environ.get("METRICS_HOST", "127.0.0.1"))
+
+def configured_sheets():
+    sheets = {"成绩总表·物理方向": (SCORE_URL_PHYSICS, 0), "成绩总表·历史方向": (SCORE_URL_HISTORY, 0)}
+    sheets.update({f"单科明细·{name}": (url, [0, 1, 2]) for name, url in SUBJECT_URLS.items()})
+    return sheets
+
+@st.cache_resource(show_spinner=False)
+def start_warmup(sheets):
+    # 每个进程 (及每套表格配置) 只预热一次：后台并发预取全部表格，页面不等待
+    return get_sheet_loader().prefetch(sheets)
+
+warmup = start_warmup(configured_sheets())
+
+def load_sheet(url, header_lines=0):
+    """(共享表的写时复制视图, 数据版本)，出自同一次 get()；未配置时为 (None, 0)"""
+    if not url or not url.strip(): return None, 0
+    with metrics.span("load_data"):
+        return get_sheet_loader().get(url, header_lines)
+
+# 以下派生结果按 (表, 数据版本) 进程级缓存，所有会话直接读同一份只读对象，不再每次反序列化拷贝
+# 数据由页面以 _df 传入 (不参与缓存键)，且必须与 version 出自同一次 load_sheet()：
+# 若在这里另取一次，后台刷新恰好落在两次 get() 之间时，新版本的结果会被记在旧版本的键下
+@metrics.registry.cached("build_knowledge_map", st.cache_resource(max_entries=64, show_spinner=False))
+def build_knowledge_map(url, version, _df):
+    """单科明细表 -> 学生 × 知识点掌握率矩阵 (按数据版本只解析一次，所有学生共用)"""
+    return freeze(analytics.build_knowledge_map(_df))
+
+@metrics.registry.cached("build_student_index", st.cache_resource(max_entries=64, show_spinner=False))
+def build_student_index(url, version, _df, header_lines=0):
+    """(姓名, 考号) -> 行号 的哈希索引，每张表每个数据版本只建一次，所有会话共用"""
+    return freeze(analytics.build_student_index(_df, multi_header=header_lines != 0))
+
+@metrics.registry.cached("_knowledge_point_mastery", st.cache_resource(max_entries=64, show_spinner=False))
+def _knowledge_point_mastery(url, version, _df):
+    return analytics.knowledge_point_mastery(_df)
+
+def knowledge_point_mastery(url, version, df):
+    return freeze(_knowledge_point_mastery(url, version, df))
+
+# ==============================================================================
+# 📊 看板聚合与图表缓存：按 (表/方向, 数据版本, 科目) 缓存，切换视图只是查表
+# ==============================================================================
+@metrics.registry.cached("score_aggregates", st.cache_resource(max_entries=64, show_spinner=False))
+def _score_aggregates(url, version, _df):
+    """成绩总表 -> 科目列表、各班均分、总分分箱"""
+    return analytics.score_aggregates(_df)
+
+def score_aggregates(url, version, df):
+    return freeze(_score_aggregates(url, version, df))
+
+@metrics.registry.cached("class_bar_figure", st.cache_resource(max_entries=256, show_spinner=False))
+def class_bar_figure(url, version, _df, column, title=None):
+    import plotly.express as px
+    return px.bar(_score_aggregates(url, version, _df)['class_avg'], x='班级', y=column, color='班级', text_auto=True, title=title)
+
+@metrics.registry.cached("score_histogram_figure", st.cache_resource(max_entries=64, show_spinner=False))
+def score_histogram_figure(url, version, _df):
+    import plotly.graph_objects as go
+    hist = _score_aggregates(url, version, _df)['hist']
+    edges, size = hist['edges'], hist['size']
+    labels = [f"{a:g} - {b:g}" for a, b in zip(edges[:-1].tolist(), edges[1:].tolist())]
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=hist['counts'], width=size, customdata=labels, hovertemplate="总分=%{customdata}<br>人数=%{y}<extra></extra>"))
+    fig.update_layout(bargap=0, xaxis_title="总分", yaxis_title="count")
+    return fig
+
+@metrics.registry.cached("mastery_figure", st.cache_resource(max_entries=128, show_spinner=False))
+def mastery_figure(url, version, _df, title=None):
+    import plotly.express as px
+    return px.bar(_knowledge_point_mastery(url, version, _df), x="掌握率", y="知识点", orientation='h', title=title)
+
+@metrics.registry.cached("item_analysis", st.cache_resource(max_entries=64, show_spinner=False))
+def _item_analysis(url, version, _df):
+    """单科明细表 -> 逐题难度/区分度/点二列相关、得分分布、各班难度 (整块矩阵一次算完)"""
+    return analytics.item_analysis(_df)
+
+def item_analysis(url, version, df):
+    return freeze(_item_analysis(url, version, df))
+
+@metrics.registry.cached("item_figures", st.cache_resource(max_entries=512, show_spinner=False))
+def item_figures(url, version, _df, q):
+    """第 q 道题的得分分布图与各班得分率图"""
+    import plotly.express as px
+    stats = _item_analysis(url, version, _df)
+    dist = stats['distribution'].iloc[q]
+    fig_dist = px.bar(x=list(dist.index[1:]), y=dist.iloc[1:].astype(float).tolist(), labels={'x': '得分段', 'y': '人数占比 (%)'}, text_auto=True, title=f"{dist['题号']} 得分分布")
+    fig_cls = px.bar(x=stats['classes'], y=stats['class_difficulty'][:, q].tolist(), labels={'x': '班级', 'y': '得分率'}, text_auto=True, title=f"{dist['题号']} 各班得分率")
+    return fig_dist, fig_cls
+
+@metrics.registry.cached("rank_index", st.cache_resource(max_entries=16, show_spinner=False))
+def rank_index(url, version, _df):
+    """成绩总表的名次索引：每个数据版本排序一次，名次/百分位/前 N 名查询都是二分查找"""
+    return analytics.RankIndex(_df) if _df is not None else None
+
+def plot(fig):
+    with metrics.span("render.plotly_chart"):
+        st.plotly_chart(fig, use_container_width=True)
+
+def top5_names(url):
+    df, ver = load_sheet(url)
+    idx = rank_index(url, ver, df) if df is not None else None
+    return idx.top_names(5) if idx is not None else []
 
 def get_dynamic_top5_banner():
-    str_p = ""
-    str_h = ""
     try:
-        if SCORE_URL_PHYSICS:
-            df_p = load_data(SCORE_URL_PHYSICS)
-            if df_p is not None and '总分' in df_p.columns and '姓名' in df_p.columns:
-                df_p['总分'] = pd.to_numeric(df_p['总分'], errors='coerce')
-                top_p = df_p.dropna(subset=['总分']).sort_values(by='总分', ascending=False).head(5)['姓名'].astype(str).str.strip().tolist()
-                if top_p: str_p = f"🚀 理科前五：{'、'.join(top_p)}"
-                
-        if SCORE_URL_HISTORY:
-            df_h = load_data(SCORE_URL_HISTORY)
-            if df_h is not None and '总分' in df_h.columns and '姓名' in df_h.columns:
-                df_h['总分'] = pd.to_numeric(df_h['总分'], errors='coerce')
-                top_h = df_h.dropna(subset=['总分']).sort_values(by='总分', ascending=False).head(5)['姓名'].astype(str).str.strip().tolist()
-                if top_h: str_h = f"🌟 文科前五：{'、'.join(top_h)}"
-                
-        if str_p or str_h:
-            banner_html = "🎉 <b>成绩表彰光荣榜</b> 🏆<br>"
-            if str_p: banner_html += f"<span style='font-size: 16px; color: #D97706;'>{str_p}</span>"
-            if str_p and str_h: banner_html += "<br>"
-            if str_h: banner_html += f"<span style='font-size: 16px; color: #D97706;'>{str_h}</span>"
-            return banner_html
-        else:
-            return "🎉 欢迎使用英华学校高中部考试学情智能分析系统！ 🏆"
+        return analytics.banner_html(top5_names(SCORE_URL_PHYSICS), top5_names(SCORE_URL_HISTORY))
     except Exception as e:
-        return "🎉 欢迎使用英华学校高中部考试学情智能分析系统！ 🏆"
+        return analytics.banner_html([], [])
 
 # ==============================================================================
-# 🧠 AI 导师功能定义 (30天缓存)
+# 🧠 AI 导师功能定义 (按提示词内容持久化缓存，重启不丢)
 # ==============================================================================
-@st.cache_data(ttl=2592000, show_spinner=False)
-def get_ai_advice_for_student(student_name, subject, weak_points, strong_points):
-    if not client: return "⚠️ AI 尚未配置，无法生成建议。"
-    prompt = f"你是拥有20年经验的高中{subject}教师。学生 {student_name} 优势：{strong_points}。薄弱：{weak_points}。请写约300字的个性化鼓励和提分计划。"
-    try:
-        res = client.chat.completions.create(model="deepseek-chat", messages=[{"role": "system", "content": "你是专业AI导师。"}, {"role": "user", "content": prompt}])
-        return res.choices[0].message.content
-    except Exception as e: return f"AI 生成失败: {e}"
-
-@st.cache_data(ttl=2592000, show_spinner=False)
-def get_ai_advice_for_teacher(subject, weak_points_list):
-    if not client: return "⚠️ AI 尚未配置。"
-    prompt = f"你是教研员。高三年级{subject}失分严重的共性薄弱点是：{weak_points_list}。请给老师们写约300字的讲评课教研建议。"
+@st.cache_resource(show_spinner=False)
+def get_ai_client(api_key, base_url):
+    # 进程级共享的 OpenAI 客户端 (复用连接池)，首次调用 AI 时才创建
+    return ai_advisor.make_client(api_key, base_url)
+
+@st.cache_resource(show_spinner=False)
+def get_advice_cache():
+    return ai_advisor.AdviceCache(os.environ.get("AI_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ai_cache", "advice.sqlite3")))
+
+def stream_ai_advice_for_student(subject, weak_points, strong_points):
+    if not AI_API_KEY: return iter(["⚠️ AI 尚未配置，无法生成建议。"])
+    return ai_advisor.stream_complete(get_ai_client(AI_API_KEY, AI_BASE_URL), get_advice_cache(), ai_advisor.STUDENT_SYSTEM, ai_advisor.student_prompt(subject, weak_points, strong_points))
+
+def stream_ai_advice_for_teacher(subject, weak_points_list):
+    if not AI_API_KEY: return iter(["⚠️ AI 尚未配置。"])
+    return ai_advisor.stream_complete(get_ai_client(AI_API_KEY, AI_BASE_URL), get_advice_cache(), ai_advisor.TEACHER_SYSTEM, ai_advisor.teacher_prompt(subject, weak_points_list))
+
+def render_ai_stream(chunks, prefix="", waiting="AI 正在云端调取报告..."):
+    # 边生成边渲染到 .ai-box，首个片段到达前先显示等待提示
+    box = st.empty()
+    box.markdown(f"<div class='ai-box'>{prefix}{waiting}</div>", unsafe_allow_html=True)
+    text = ""
     try:
-        res = client.chat.completions.create(model="deepseek-chat", messages=[{"role": "system", "content": "你是教研专家AI。"}, {"role": "user", "content": prompt}])
-        return res.choices[0].message.content
-    except Exception as e: return f"AI 生成失败: {e}"
+        for chunk in chunks:
+            text += chunk
+            box.markdown(f"<div class='ai-box'>{prefix}{text}▌</div>", unsafe_allow_html=True)
+    except Exception as e: text = f"AI 生成失败: {e}"
+    box.markdown(f"<div class='ai-box'>{prefix}{text}</div>", unsafe_allow_html=True)
+
+def cohort_advice_prompts(subject, kmap):
+    """全年级每位学生的 (系统提示, 提示词)，与深度诊断页的薄弱/优势判定完全一致，已按知识点组合去重"""
+    return [(ai_advisor.STUDENT_SYSTEM, ai_advisor.student_prompt(subject, w_str, s_str)) for w_str, s_str in analytics.weak_strong_sets(kmap)]
 
 # ==============================================================================
 # --- 状态与样式 ---
@@ -112,6 +219,28 @@ if 'is_admin' not in st.session_state: st.session_state.is_admin = False
 if 'is_teacher' not in st.session_state: st.session_state.is_teacher = False
 if 'teacher_subject' not in st.session_state: st.session_state.teacher_subject = None
 
+# 动态 WebP / 海报的固有尺寸 (build_assets.py 的产物)：写进 <img> 让浏览器先按比例占位，海报背景才能在动画到达前显示
+LOGIN_ART_SIZES = {"panda": (480, 270), "star": (480, 430)}
+
+@st.cache_resource(show_spinner=False)
+def login_art_html(name):
+    """
+    登录页动画：先显示几 KB 的首帧海报，再由浏览器从静态目录加载动态 WebP。
+    Streamlit 的静态路由不发 Cache-Control，只带 ETag：浏览器每次打开页面仍会条件请求一次，但内容未变时只回 304，不重新下载。
+    """
+    static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    files = [f"{name}.webp", f"{name}_poster.webp", f"{name}.png"]
+    if not all(os.path.exists(os.path.join(static_dir, f)) for f in files): return None
+    anim, poster, still = (f"app/static/{f}" for f in files)
+    w, h = LOGIN_ART_SIZES[name]
+    return (f'<picture><source srcset="{anim}" type="image/webp">'
+            f'<img src="{still}" alt="" width="{w}" height="{h}" style="width: 100%; height: auto; background: url({poster}) center / contain no-repeat;"></picture>')
+
+def show_login_art(name):
+    html = login_art_html(name)
+    if html: st.markdown(html, unsafe_allow_html=True)
+    elif os.path.exists(f"{name}.gif"): st.image(f"{name}.gif", use_container_width=True)
+
 def logout():
     st.session_state.logged_in_student = None
     st.session_state.logged_in_direction = None
@@ -120,6 +249,7 @@ def logout():
     st.session_state.teacher_subject = None
     st.rerun()
 
+# 全局样式保持内联：Streamlit 每次重跑都会重发页面上的全部元素，没有只注入一次的接口；样式块约 1.6 KB，与图表数据相比可以忽略
 st.markdown("""
 <style>
     #MainMenu {visibility: hidden;} header {visibility: hidden;} footer {visibility: hidden;}
@@ -160,6 +290,7 @@ selected_nav = option_menu(
 # ==============================================================================
 # 🚀 页面逻辑
 # ==============================================================================
+page_stage = selected_nav  # 脚本跑完时按页面 (后台细分到功能页) 记一次整页耗时
 if selected_nav in ["成绩总览", "深度诊断"]:
     
     if not st.session_state.logged_in_student:
@@ -170,7 +301,7 @@ if selected_nav in ["成绩总览", "深度诊断"]:
         col_left, col_mid, col_right = st.columns([1, 1.8, 1])
         with col_left:
             st.markdown("<br><br>", unsafe_allow_html=True)
-            if os.path.exists("panda.gif"): st.image("panda.gif", use_container_width=True)
+            show_login_art("panda")
         with col_mid:
             with st.form("student_login"):
                 st.markdown("<h3 style='text-align: center; color: #555;'>👨‍🎓 学生/家长登录入口</h3><br>", unsafe_allow_html=True)
@@ -186,7 +317,7 @@ if selected_nav in ["成绩总览", "深度诊断"]:
                     else: st.error("⚠️ 请完整填写姓名和考号")
         with col_right:
             st.markdown("<br><br>", unsafe_allow_html=True)
-            if os.path.exists("star.gif"): st.image("star.gif", use_container_width=True)
+            show_login_art("star")
     
     else:
         c1, c2 = st.columns([4, 1])
@@ -197,37 +328,37 @@ if selected_nav in ["成绩总览", "深度诊断"]:
         target_url = SCORE_URL_PHYSICS if st.session_state.logged_in_direction == "物理方向" else SCORE_URL_HISTORY
         
         if selected_nav == "成绩总览":
-            df = load_data(target_url)
+            df, score_ver = load_sheet(target_url)
             if df is not None:
-                id_col = '考号' if '考号' in df.columns else '学号'
-                df[id_col] = df[id_col].astype(str).str.strip()
-                student = df[(df['姓名'].astype(str).str.strip() == st.session_state.logged_in_student) & (df[id_col] == st.session_state.logged_in_id)]
-                
-                if len(student) == 0: st.error("❌ 未匹配到成绩。请确认考号和方向。")
+                row_idx = build_student_index(target_url, score_ver, df).get((st.session_state.logged_in_student, st.session_state.logged_in_id))
+                if row_idx is None: st.error("❌ 未匹配到成绩。请确认考号和方向。")
                 else:
-                    stu_data = student.iloc[0]
+                    stu_data = df.iloc[row_idx]
                     k1, k2, k3, k4 = st.columns(4)
                     k1.metric("姓名", stu_data['姓名'])
                     k2.metric("方向", st.session_state.logged_in_direction)
-                    total = stu_data.get('总分', 0)
-                    k3.metric("考试总分", f"{total}")
-                    k4.metric("班级排名", stu_data.get('班级排名', 'N/A'))
+                    k3.metric("考试总分", analytics.fmt_number(stu_data.get('总分', 0)))
+                    k4.metric("班级排名", analytics.fmt_number(stu_data.get('班级排名')))
+
+                    ranks = rank_index(target_url, score_ver, df)
+                    standing = ranks.standing(stu_data) if ranks is not None else []
+                    if standing and standing[0][0] == '总分':
+                        _, _, g_rank, _, pct = standing[0]
+                        r1, r2, r3 = st.columns(3)
+                        r1.metric("年级排名", f"{g_rank} / {ranks.size('总分')}")
+                        r2.metric("超过全年级", f"{pct}%")
+                        r3.metric("年级最高分", analytics.fmt_number(ranks.top_score('总分')))
                     
                     st.markdown("<br>### 📊 各科得分对比", unsafe_allow_html=True)
-                    exclude_cols = ['姓名', '考号', '学号', '班级', '总分', '班级排名', '年级排名', 'Unnamed', '序号']
-                    subject_cols = [c for c in df.columns if c not in exclude_cols and not str(c).startswith('Unnamed') and pd.to_numeric(stu_data[c], errors='coerce') >= 0]
-                    if subject_cols:
-                        chart_data = pd.DataFrame({"科目": subject_cols, "得分": [stu_data[c] for c in subject_cols]})
+                    subject_scores = analytics.student_subject_scores(df, stu_data)
+                    if subject_scores:
                         col_bar, col_radar = st.columns(2)
-                        with col_bar:
-                            fig1 = px.bar(chart_data, x='科目', y='得分', text_auto=True, color='科目')
-                            fig1.update_layout(showlegend=False, margin=dict(t=40, b=20, l=20, r=20), paper_bgcolor='rgba(0,0,0,0)')
-                            st.plotly_chart(fig1, use_container_width=True)
-                        with col_radar:
-                            fig2 = px.line_polar(chart_data, r='得分', theta='科目', line_close=True)
-                            fig2.update_traces(fill='toself', line_color='#0068C9')
-                            fig2.update_layout(margin=dict(t=40, b=20, l=40, r=40), paper_bgcolor='rgba(0,0,0,0)')
-                            st.plotly_chart(fig2, use_container_width=True)
+                        with col_bar: plot(charts.subject_bar(subject_scores))
+                        with col_radar: plot(charts.subject_radar(subject_scores))
+                    if standing:
+                        st.markdown("### 🧭 年级 / 班级位次")
+                        st.dataframe(pd.DataFrame([{"科目": c, "得分": analytics.fmt_number(v), "年级排名": g, "班级排名": k, "超过全年级": f"{p}%"}
+                                                   for c, v, g, k, p in standing]), hide_index=True, use_container_width=True)
             else: st.warning("数据未准备好。")
                 
         elif selected_nav == "深度诊断":
@@ -235,70 +366,31 @@ if selected_nav in ["成绩总览", "深度诊断"]:
             if not avail_subs: st.info("暂未配置单科诊断数据。")
             else:
                 sel_sub = st.selectbox("👇 选择科目报告", list(avail_subs.keys()))
-                df_diag = load_data(avail_subs[sel_sub], header_lines=[0, 1, 2])
-                if df_diag is not None:
-                    name_idx, id_idx = -1, -1
-                    for i, col in enumerate(df_diag.columns):
-                        if '姓名' in str(col[0]): name_idx = i
-                        if '考号' in str(col[0]) or '学号' in str(col[0]): id_idx = i
-                    if name_idx != -1 and id_idx != -1:
-                        all_names = df_diag.iloc[:, name_idx].astype(str).str.strip().values
-                        all_ids = df_diag.iloc[:, id_idx].astype(str).str.strip().values
-                        found_idx = -1
-                        for idx, (n, i) in enumerate(zip(all_names, all_ids)):
-                            if n == st.session_state.logged_in_student and i == st.session_state.logged_in_id: found_idx = idx; break
-                        if found_idx == -1: st.warning("未查到该科数据。")
-                        else:
-                            knowledge_map = {} 
-                            for col in df_diag.columns:
-                                q_name, k_point = str(col[0]).strip(), str(col[1]).strip()
-                                try: full = float(col[2])
-                                except: full = 0
-                                if '姓名' in q_name or '考号' in q_name or full <= 0: continue
-                                if k_point not in knowledge_map: knowledge_map[k_point] = {'my': 0, 'full': 0, 'class_total': 0}
-                                try: my_s = float(df_diag.iloc[found_idx][col])
-                                except: my_s = 0
-                                class_s = pd.to_numeric(df_diag[col], errors='coerce').mean()
-                                knowledge_map[k_point]['my'] += my_s
-                                knowledge_map[k_point]['full'] += full
-                                knowledge_map[k_point]['class_total'] += class_s
-                            
-                            k_data, weak_points_list, strong_points_list = [], [], []
-                            for kp, val in knowledge_map.items():
-                                my_rate = round((val['my']/val['full'])*100, 1) if val['full']>0 else 0
-                                avg_rate = round((val['class_total']/val['full'])*100, 1) if val['full']>0 else 0
-                                k_data.append({'知识点': kp, '我的掌握率': my_rate, '班级平均': avg_rate})
-                                if my_rate < avg_rate: weak_points_list.append(kp)
-                                else: strong_points_list.append(kp)
+                df_d, diag_ver = load_sheet(avail_subs[sel_sub], [0, 1, 2])
+                stu_index = build_student_index(avail_subs[sel_sub], diag_ver, df_d, header_lines=[0, 1, 2]) if df_d is not None else None
+                if stu_index is not None:
+                    found_idx = stu_index.get((st.session_state.logged_in_student, st.session_state.logged_in_id), -1)
+                    if found_idx == -1: st.warning("未查到该科数据。")
+                    else:
+                        kmap = build_knowledge_map(avail_subs[sel_sub], diag_ver, df_d)
+                        k_data, weak_points_list, strong_points_list = charts.knowledge_rows(kmap, found_idx)
+                        if k_data:
+                            c_chart, c_text = st.columns([1.2, 1])
+                            with c_chart: plot(charts.knowledge_radar(k_data))
+                            with c_text:
+                                st.markdown("#### 🩺 专家系统诊断")
+                                if weak_points_list:
+                                    for row in k_data:
+                                        if row['知识点'] in weak_points_list:
+                                            st.write(f"▪ **{row['知识点']}** (落后 {row['班级平均'] - row['我的掌握率']:.1f}%)")
+                                else: st.success("🎉 所有知识点均达标！")
                             
-                            df_kp = pd.DataFrame(k_data)
-                            if not df_kp.empty:
-                                c_chart, c_text = st.columns([1.2, 1])
-                                with c_chart:
-                                    fig = go.Figure()
-                                    cats = df_kp['知识点'].tolist() + [df_kp['知识点'].tolist()[0]]
-                                    mys = df_kp['我的掌握率'].tolist() + [df_kp['我的掌握率'].tolist()[0]]
-                                    avgs = df_kp['班级平均'].tolist() + [df_kp['班级平均'].tolist()[0]]
-                                    fig.add_trace(go.Scatterpolar(r=avgs, theta=cats, fill='toself', name='班级平均', line_color='#cccccc'))
-                                    fig.add_trace(go.Scatterpolar(r=mys, theta=cats, fill='toself', name='我的掌握', line_color='#FF4B4B'))
-                                    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])), paper_bgcolor='rgba(0,0,0,0)')
-                                    st.plotly_chart(fig, use_container_width=True)
-                                with c_text:
-                                    st.markdown("#### 🩺 专家系统诊断")
-                                    if weak_points_list:
-                                        for row in k_data:
-                                            if row['知识点'] in weak_points_list:
-                                                st.write(f"▪ **{row['知识点']}** (落后 {row['班级平均'] - row['我的掌握率']:.1f}%)")
-                                    else: st.success("🎉 所有知识点均达标！")
-                                
-                                st.divider()
-                                if AI_API_KEY:
-                                    if st.button(f"✨ 提取专家 AI 提分建议", type="primary"):
-                                        with st.spinner("AI 导师正在云端调取档案..."):
-                                            w_str = "、".join(weak_points_list) if weak_points_list else "无"
-                                            s_str = "、".join(strong_points_list) if strong_points_list else "无"
-                                            ai_reply = get_ai_advice_for_student(st.session_state.logged_in_student, sel_sub, w_str, s_str)
-                                            st.markdown(f"<div class='ai-box'><b>AI导师：</b><br><br>{ai_reply}</div>", unsafe_allow_html=True)
+                            st.divider()
+                            if AI_API_KEY:
+                                if st.button(f"✨ 提取专家 AI 提分建议", type="primary"):
+                                    w_str = "、".join(weak_points_list) if weak_points_list else "无"
+                                    s_str = "、".join(strong_points_list) if strong_points_list else "无"
+                                    render_ai_stream(stream_ai_advice_for_student(sel_sub, w_str, s_str), prefix="<b>AI导师：</b><br><br>", waiting="AI 导师正在云端调取档案...")
 
 # ==============================================================================
 # 🚀 页面 3: 教师后台 (包含超级管理 & 次级单科管理)
@@ -313,7 +405,7 @@ elif selected_nav == "教师后台":
         col_left, col_mid, col_right = st.columns([1, 1.8, 1])
         with col_left:
             st.markdown("<br><br>", unsafe_allow_html=True)
-            if os.path.exists("panda.gif"): st.image("panda.gif", use_container_width=True)
+            show_login_art("panda")
         with col_mid:
             # 🔴 关键修复：去掉了 st.form，使用 st.container(border=True) 完美替代！
             with st.container(border=True):
@@ -341,55 +433,114 @@ elif selected_nav == "教师后台":
                         st.error("密码错误，请重试。")
         with col_right:
             st.markdown("<br><br>", unsafe_allow_html=True)
-            if os.path.exists("star.gif"): st.image("star.gif", use_container_width=True)
+            show_login_art("star")
             
     # --- 2. 教务处超级管理界面 ---
     elif st.session_state.is_admin:
         c1, c2 = st.columns([5, 1])
         c1.markdown("### 👑 教务处全局控制台 (全科权限)")
         if c2.button("🚪 退出后台", use_container_width=True): logout()
-        adm_menu = st.radio("功能：", ["🏆 班级成绩PK", "📈 学情总览", "🧠 AI教研"], horizontal=True)
+        with st.expander("📡 数据预热状态"):
+            if not warmup.done(): st.info("后台正在并发预取全部表格...")
+            elif warmup.exception(): st.error(f"预热失败：{warmup.exception()}")
+            else:
+                st.dataframe(pd.DataFrame([{"表格": r['sheet'], "成功": r['ok'], "结果": r['outcome'], "下载(秒)": r['fetch_s'], "解析(秒)": r['parse_s'],
+                                            "行数": r['rows'], "版本": r['version'], "异常单元格": (r['validation'] or {}).get('invalid_cells', 0),
+                                            "错误": r['error']} for r in warmup.result()]), hide_index=True, use_container_width=True)
+                for r in warmup.result():
+                    v = r['validation'] or {}
+                    if v.get('missing'): st.warning(f"{r['sheet']}：缺少必需列 {'、'.join(v['missing'])}")
+                    for c in v.get('columns', []):
+                        st.caption(f"⚠️ {r['sheet']} · {c['column']}：{c['invalid']} 个单元格不是数字 (如 {'、'.join(c['examples'])})，已按缺考处理")
+        adm_menu = st.radio("功能：", ["🏆 班级成绩PK", "📈 学情总览", "🧠 AI教研", "📄 批量导出学生报告", "⏱️ 性能监控"], horizontal=True)
+        page_stage = f"教务处·{adm_menu.split(' ', 1)[-1]}"
         adm_direction = st.selectbox("方向", ["物理方向", "历史方向"])
         target_url = SCORE_URL_PHYSICS if adm_direction == "物理方向" else SCORE_URL_HISTORY
         
         if adm_menu == "🏆 班级成绩PK":
-            df = load_data(target_url)
-            if df is not None and '班级' in df.columns:
-                exclude = ['姓名', '考号', '学号', '班级', '排名', '总分', '班级排名', '年级排名']
-                subjects = [c for c in df.columns if c not in exclude and pd.to_numeric(df[c], errors='coerce').notna().all()]
-                class_avg = df.groupby('班级')[subjects + ['总分']].mean().round(1).reset_index()
+            df, score_ver = load_sheet(target_url)
+            if df is not None and score_aggregates(target_url, score_ver, df)['class_avg'] is not None:
+                subjects = score_aggregates(target_url, score_ver, df)['subjects']
                 c_a, c_b = st.columns(2)
-                with c_a: st.plotly_chart(px.bar(class_avg, x='班级', y='总分', color='班级', text_auto=True), use_container_width=True)
+                with c_a: plot(class_bar_figure(target_url, score_ver, df, '总分'))
                 with c_b:
                     sel_sub = st.selectbox("单科视角", subjects)
-                    st.plotly_chart(px.bar(class_avg, x='班级', y=sel_sub, color='班级', text_auto=True), use_container_width=True)
+                    plot(class_bar_figure(target_url, score_ver, df, sel_sub))
 
         elif adm_menu == "📈 学情总览":
-            df = load_data(target_url)
-            if df is not None and '总分' in df.columns:
-                st.plotly_chart(px.histogram(df, x="总分", nbins=15), use_container_width=True)
+            df, score_ver = load_sheet(target_url)
+            if df is not None and score_aggregates(target_url, score_ver, df)['hist'] is not None:
+                plot(score_histogram_figure(target_url, score_ver, df))
 
         elif adm_menu == "🧠 AI教研":
             avail_subs = [k for k, v in SUBJECT_URLS.items() if v and v.strip()]
             sel_diagnosis = st.selectbox("选择学科", avail_subs) if avail_subs else None
             if sel_diagnosis:
-                df_diag = load_data(SUBJECT_URLS[sel_diagnosis], header_lines=[0, 1, 2])
-                if df_diag is not None:
-                    k_stats = {}
-                    for col in df_diag.columns:
-                        try: full = float(col[2])
-                        except: full = 0
-                        if full > 0 and '姓名' not in str(col[0]):
-                            kp = str(col[1]).strip()
-                            if kp not in k_stats: k_stats[kp] = []
-                            k_stats[kp].append(pd.to_numeric(df_diag[col], errors='coerce').mean() / full)
-                    if k_stats:
-                        k_final = [{"知识点": kp, "掌握率": round(sum(rates)/len(rates)*100, 1)} for kp, rates in k_stats.items()]
-                        df_k = pd.DataFrame(k_final).sort_values("掌握率")
-                        st.plotly_chart(px.bar(df_k, x="掌握率", y="知识点", orientation='h'), use_container_width=True)
-                        if AI_API_KEY and st.button("✨ 提取专家 AI 教研建议", type="primary"):
-                            with st.spinner("AI 正在云端调取报告..."):
-                                st.markdown(f"<div class='ai-box'>{get_ai_advice_for_teacher(sel_diagnosis, '、'.join(df_k.head(3)['知识点'].tolist()))}</div>", unsafe_allow_html=True)
+                df_d, diag_ver = load_sheet(SUBJECT_URLS[sel_diagnosis], [0, 1, 2])
+                df_k = knowledge_point_mastery(SUBJECT_URLS[sel_diagnosis], diag_ver, df_d) if df_d is not None else None
+                if df_k is not None and not df_k.empty:
+                    plot(mastery_figure(SUBJECT_URLS[sel_diagnosis], diag_ver, df_d))
+                    if AI_API_KEY and st.button("✨ 提取专家 AI 教研建议", type="primary"):
+                        render_ai_stream(stream_ai_advice_for_teacher(sel_diagnosis, '、'.join(df_k.head(3)['知识点'].tolist())))
+
+            if AI_API_KEY:
+                st.divider()
+                st.caption("每次导入新考试后，可一键为全年级预生成学生 AI 提分建议；知识点组合相同的学生共用一条，学生端点击即刻返回。")
+                if st.button("⚡ 批量预生成全年级学生 AI 提分建议"):
+                    prompts = []
+                    for sub_name, sub_url in SUBJECT_URLS.items():
+                        if not sub_url or not sub_url.strip(): continue
+                        df_d, diag_ver = load_sheet(sub_url, [0, 1, 2])
+                        kmap = build_knowledge_map(sub_url, diag_ver, df_d) if df_d is not None else None
+                        if kmap: prompts += cohort_advice_prompts(sub_name, kmap)
+                    bar = st.progress(0.0, text="AI 正在批量生成...")
+                    summary = ai_advisor.pregenerate(AI_API_KEY, AI_BASE_URL, get_advice_cache(), prompts, on_progress=lambda done, n: bar.progress(done / n, text=f"AI 正在批量生成... {done}/{n}"))
+                    bar.empty()
+                    st.success(f"✅ 预生成完成：去重后共 {summary['unique']} 条建议，已有缓存 {summary['cached']} 条，新生成 {summary['generated']} 条，失败 {summary['failed']} 条。")
+
+        elif adm_menu == "📄 批量导出学生报告":
+            st.caption("为所选方向的全体学生生成成绩总览 + 各科深度诊断报告 (每人一个 HTML，含已缓存的 AI 提分建议)，打包成 ZIP 下载；浏览器打开后可直接打印或另存为 PDF。")
+            df, score_ver = load_sheet(target_url)
+            if st.button("📦 生成全部学生报告", type="primary", disabled=df is None):
+                subjects = {}
+                for sub_name, sub_url in SUBJECT_URLS.items():
+                    df_d, sub_ver = load_sheet(sub_url, [0, 1, 2])
+                    if df_d is None: continue
+                    subjects[sub_name] = (build_student_index(sub_url, sub_ver, df_d, header_lines=[0, 1, 2]), build_knowledge_map(sub_url, sub_ver, df_d))
+                cache = get_advice_cache()
+                advice = lambda sub, w, s: cache.get(ai_advisor.cache_key(ai_advisor.STUDENT_SYSTEM, ai_advisor.student_prompt(sub, w, s)))
+                payloads = report_export.build_payloads(df, adm_direction, rank_index(target_url, score_ver, df), subjects, advice)
+                bar = st.progress(0.0, text="正在生成学生报告...")
+                data, summary = report_export.export_reports(payloads, on_progress=lambda done, n: bar.progress(done / n, text=f"正在生成学生报告... {done}/{n}"))
+                bar.empty()
+                st.session_state.report_zip = (f"学生报告_{adm_direction}.zip", data, summary)
+            if st.session_state.get('report_zip'):
+                zip_name, data, summary = st.session_state.report_zip
+                st.success(f"✅ 已生成 {summary['students']} 份学生报告，用时 {summary['seconds']} 秒。")
+                st.download_button("⬇️ 下载报告 ZIP", data, file_name=zip_name, mime="application/zip")
+
+        elif adm_menu == "⏱️ 性能监控":
+            st.caption("本进程自启动 (或上次清零) 以来的热点路径耗时：p50/p95/最大取每个阶段最近 1000 次；page.* 为整页重跑，compute.* 为缓存未命中时的实际计算。")
+            perf = metrics.registry.summary()
+            if perf:
+                st.dataframe(pd.DataFrame(perf).rename(columns={'stage': '阶段', 'count': '次数', 'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'max_ms': '最大 (ms)', 'last_ms': '最近 (ms)', 'total_s': '累计 (秒)'}),
+                             hide_index=True, use_container_width=True)
+            else: st.info("暂无记录。")
+            c_cache, c_mem = st.columns(2)
+            with c_cache:
+                st.markdown("**缓存命中率**")
+                st.dataframe(pd.DataFrame(metrics.registry.cache_stats(), columns=['cache', 'hit', 'miss', 'hit_rate']).rename(columns={'cache': '缓存', 'hit': '命中', 'miss': '未命中', 'hit_rate': '命中率'}),
+                             hide_index=True, use_container_width=True)
+            with c_mem:
+                st.markdown("**表格内存占用**")
+                st.dataframe(pd.DataFrame([{"表格": k, "内存 (KB)": round(v / 1024, 1)} for k, v in get_sheet_loader().footprint(configured_sheets()).items()], columns=["表格", "内存 (KB)"]),
+                             hide_index=True, use_container_width=True)
+            c_dl, c_reset = st.columns(2)
+            c_dl.download_button("⬇️ 导出 Prometheus 指标", metrics.registry.prometheus(), file_name="metrics.txt", mime="text/plain")
+            if c_reset.button("🔄 清零统计"):
+                metrics.registry.reset()
+                st.rerun()
+            if os.environ.get("METRICS_PORT"): st.caption(f"Prometheus 抓取端点：:{os.environ['METRICS_PORT']}/metrics")
 
     # --- 3. 学科教师单科隔离界面 ---
     elif st.session_state.is_teacher:
@@ -401,38 +552,41 @@ elif selected_nav == "教师后台":
         if c2.button("🚪 退出后台", use_container_width=True): logout()
         
         adm_menu = st.radio("专属功能：", [f"🏆 班级 {pure_sub_name} 成绩对比", f"🧠 {pure_sub_name} 共性诊断与 AI 教研"], horizontal=True)
+        page_stage = f"教师·{'成绩对比' if '成绩对比' in adm_menu else '共性诊断'}"
         adm_direction = st.selectbox("方向选择", ["物理方向", "历史方向"])
         target_url = SCORE_URL_PHYSICS if adm_direction == "物理方向" else SCORE_URL_HISTORY
         
         if "成绩对比" in adm_menu:
-            df = load_data(target_url)
+            df, score_ver = load_sheet(target_url)
             if df is not None:
-                if pure_sub_name in df.columns and '班级' in df.columns:
-                    df[pure_sub_name] = pd.to_numeric(df[pure_sub_name], errors='coerce')
-                    class_avg = df.groupby('班级')[pure_sub_name].mean().round(1).reset_index()
+                class_avg = score_aggregates(target_url, score_ver, df)['class_avg']
+                if class_avg is not None and pure_sub_name in class_avg.columns:
                     st.success(f"🔒 隐私保护已生效：您当前仅能查看各班级的【{pure_sub_name}】单科成绩分布，总分及其他科目已自动隐藏。")
-                    st.plotly_chart(px.bar(class_avg, x='班级', y=pure_sub_name, color='班级', text_auto=True, title=f"各班【{pure_sub_name}】均分对比"), use_container_width=True)
+                    plot(class_bar_figure(target_url, score_ver, df, pure_sub_name, f"各班【{pure_sub_name}】均分对比"))
                 else:
                     st.warning(f"⚠️ 在当前的【{adm_direction}】总成绩表中，未找到【{pure_sub_name}】科目的有效数据。请切换方向试试。")
         
         elif "教研" in adm_menu:
             st.success(f"🔒 隐私保护已生效：您当前已直达【{current_sub}】题库底层数据。")
-            df_diag = load_data(SUBJECT_URLS.get(current_sub, ""), header_lines=[0, 1, 2])
-            if df_diag is not None:
-                k_stats = {}
-                for col in df_diag.columns:
-                    try: full = float(col[2])
-                    except: full = 0
-                    if full > 0 and '姓名' not in str(col[0]):
-                        kp = str(col[1]).strip()
-                        if kp not in k_stats: k_stats[kp] = []
-                        k_stats[kp].append(pd.to_numeric(df_diag[col], errors='coerce').mean() / full)
-                if k_stats:
-                    k_final = [{"知识点": kp, "掌握率": round(sum(rates)/len(rates)*100, 1)} for kp, rates in k_stats.items()]
-                    df_k = pd.DataFrame(k_final).sort_values("掌握率")
-                    st.plotly_chart(px.bar(df_k, x="掌握率", y="知识点", orientation='h', title=f"全年级【{pure_sub_name}】薄弱知识点扫描"), use_container_width=True)
+            sub_url = SUBJECT_URLS.get(current_sub, "")
+            df_d, diag_ver = load_sheet(sub_url, [0, 1, 2])
+            df_k = knowledge_point_mastery(sub_url, diag_ver, df_d) if df_d is not None else None
+            if df_k is not None:
+                if not df_k.empty:
+                    plot(mastery_figure(sub_url, diag_ver, df_d, f"全年级【{pure_sub_name}】薄弱知识点扫描"))
                     if AI_API_KEY and st.button(f"✨ 提取【{pure_sub_name}】AI 教研建议", type="primary"):
-                        with st.spinner("AI 正在云端调取报告..."):
-                            st.markdown(f"<div class='ai-box'>{get_ai_advice_for_teacher(current_sub, '、'.join(df_k.head(3)['知识点'].tolist()))}</div>", unsafe_allow_html=True)
+                        render_ai_stream(stream_ai_advice_for_teacher(current_sub, '、'.join(df_k.head(3)['知识点'].tolist())))
+
+                    st.markdown(f"#### 📋 【{pure_sub_name}】试题质量分析")
+                    st.caption("难度 = 得分率；区分度 = 总分前 27% 与后 27% 学生得分率之差 (低于 0.2 建议复查)；点二列相关 = 本题得分与其余题总分的相关系数。")
+                    stats = item_analysis(sub_url, diag_ver, df_d)
+                    st.dataframe(stats['items'], hide_index=True, use_container_width=True)
+                    q = st.selectbox("查看单题", range(len(stats['items'])), format_func=lambda i: f"{stats['items']['题号'].iloc[i]} · {stats['items']['知识点'].iloc[i]}")
+                    fig_dist, fig_cls = item_figures(sub_url, diag_ver, df_d, q)
+                    c_d, c_c = st.columns(2)
+                    with c_d: plot(fig_dist)
+                    with c_c: plot(fig_cls)
             else:
                 st.warning(f"⚠️ 暂未获取到【{current_sub}】的单科诊断表格。")
+
+metrics.registry.observe(f"page.{page_stage}", time.perf_counter() - page_t0)
@@ -0,0 +1 @@
+"""基准与压测 (在仓库根目录下用 python -m benchmarks.<模块> 运行)"""
@@ -0,0 +1,138 @@
+"""
+热点路径基准：对不同规模的合成年级数据，逐项计时并记录内存峰值
+
+覆盖的路径 (与 app.py 调用的是同一套函数)：
+- load_data    冷加载 (读文件 + 按 schema 类型化解析) 与热读取 (共享快照的浅视图)
+- lookup       建学生哈希索引 + 单次 (姓名, 考号) 查找
+- knowledge    建学生 × 知识点矩阵 + 单个学生的知识点诊断行
+- banner       建名次索引 + 前五名；对照：整表排序求前五名
+- class_pk     班级成绩PK / 学情总览的看板聚合
+- items        试题质量分析
+
+用法：
+    python -m benchmarks.bench_paths --sizes 100,1000,10000,50000 --json bench.json
+    python -m benchmarks.bench_paths --sizes 1000 --compare bench.json   # 与上次结果对比，变慢超过阈值的标出来
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import analytics
+import charts
+from sheet_loader import SheetLoader
+from benchmarks.synthetic import write_dataset
+
+
+def measure(fn, repeat=1):
+    """返回 (结果, 中位耗时毫秒, 内存峰值 MB)；tracemalloc 会拖慢分配密集的代码，计时和测内存分两次跑"""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return result, statistics.median(times), peak
+
+
+def per_call(fn, args, repeat=3):
+    """对一批参数逐个调用，返回单次调用的平均耗时 (微秒)"""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for a in args: fn(a)
+        best = min(best, (time.perf_counter() - t0) / len(args) * 1e6)
+    return best
+
+
+def bench_size(n, classes, questions, kps, seed=0):
+    rows = []
+    record = lambda stage, ms, mb, **extra: rows.append({'students': n, 'stage': stage, 'ms': round(ms, 3), 'peak_mb': round(mb, 2), **extra})
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_dataset(tmp, n, classes, questions, kps, seed=seed)
+        cold = lambda path, header=0: SheetLoader(parse=analytics.parse_sheet).get(path, header)[0]
+        df, ms, mb = measure(lambda: cold(paths['physics']), repeat=3)
+        record('load_data.score.cold', ms, mb, frame_mb=round(df.memory_usage(deep=True).sum() / 2 ** 20, 2))
+        d, ms, mb = measure(lambda: cold(paths['d_physics'], [0, 1, 2]), repeat=3)
+        record('load_data.detail.cold', ms, mb, frame_mb=round(d.memory_usage(deep=True).sum() / 2 ** 20, 2))
+        loader = SheetLoader(parse=analytics.parse_sheet)
+        loader.get(paths['physics'])
+        _, ms, mb = measure(lambda: loader.get(paths['physics'])[0], repeat=20)
+        record('load_data.warm', ms, mb)
+
+        rng = np.random.default_rng(seed)
+        sample = rng.integers(0, n, min(n, 2000))
+        keys = [(df['姓名'].iat[i], df['考号'].iat[i]) for i in sample]
+        index, ms, mb = measure(lambda: analytics.build_student_index(df))
+        record('lookup.build', ms, mb, per_call_us=round(per_call(index.get, keys), 3))
+
+        d_index = analytics.build_student_index(d, multi_header=True)
+        kmap, ms, mb = measure(lambda: analytics.build_knowledge_map(d))
+        rows_idx = [d_index[k] for k in keys if k in d_index]
+        record('knowledge.build', ms, mb, per_call_us=round(per_call(lambda r: charts.knowledge_rows(kmap, r), rows_idx), 3))
+
+        ranks, ms, mb = measure(lambda: analytics.RankIndex(df))
+        record('banner.rank_index', ms, mb, per_call_us=round(per_call(lambda _: ranks.top_names(5), range(200)), 3))
+        _, ms, mb = measure(lambda: analytics.top_names(df), repeat=5)
+        record('banner.full_sort', ms, mb)
+        stu_rows = [df.iloc[i] for i in sample[:200]]
+        record('standing.lookup', 0, 0, per_call_us=round(per_call(ranks.standing, stu_rows), 3))
+
+        _, ms, mb = measure(lambda: analytics.score_aggregates(df))
+        record('class_pk.aggregates', ms, mb)
+        _, ms, mb = measure(lambda: analytics.item_analysis(d))
+        record('items.analysis', ms, mb)
+    return rows
+
+
+def compare(rows, baseline, threshold):
+    base = {(r['students'], r['stage']): r for r in baseline}
+    print(f"\n{'students':>8}  {'stage':<24}{'ms':>10}{'base ms':>10}{'ratio':>8}")
+    regressions = 0
+    for r in rows:
+        b = base.get((r['students'], r['stage']))
+        if not b: continue
+        for field in ('ms', 'per_call_us'):
+            if not b.get(field) or field not in r: continue
+            ratio = r[field] / b[field]
+            flag = '  ⚠️ slower' if ratio > 1 + threshold else ''
+            regressions += bool(flag)
+            print(f"{r['students']:>8}  {r['stage'] + ('' if field == 'ms' else ' /call'):<24}{r[field]:>10.3f}{b[field]:>10.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="热点路径基准")
+    ap.add_argument('--sizes', default='100,1000,10000,50000')
+    ap.add_argument('--classes', type=int, default=20)
+    ap.add_argument('--questions', type=int, default=40)
+    ap.add_argument('--kps', type=int, default=12)
+    ap.add_argument('--json', help="把结果写到该文件")
+    ap.add_argument('--compare', help="与之前 --json 写出的结果对比")
+    ap.add_argument('--threshold', type=float, default=0.25, help="变慢超过该比例记为回归 (默认 25%%)")
+    args = ap.parse_args()
+
+    rows = []
+    for n in (int(s) for s in args.sizes.split(',')):
+        rows += bench_size(n, args.classes, args.questions, args.kps)
+    print(f"{'students':>8}  {'stage':<24}{'ms':>10}{'peak MB':>10}{'per call µs':>13}{'frame MB':>10}")
+    for r in rows:
+        print(f"{r['students']:>8}  {r['stage']:<24}{r['ms']:>10.3f}{r['peak_mb']:>10.2f}{r.get('per_call_us', ''):>13}{r.get('frame_mb', ''):>10}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, ensure_ascii=False, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(rows, json.load(f), args.threshold)
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+并发会话压测：用 Streamlit AppTest 模拟多个会话，数据来自本地 HTTP 服务的合成 CSV
+
+每个会话依次走：学生成绩总览 → 深度诊断 (两科) → 教务处班级成绩PK → 学情总览 → 教师共性诊断，
+记录每次页面重跑的耗时 (p50 / p95 / 最大) 和进程常驻内存的增长。
+
+AppTest 每次运行都会装/拆进程全局的 Runtime 单例，同一进程里的会话不能真正并行：
+- 进程内：多个会话交替运行 (串行化)，共享进程级缓存 (表格快照、索引、聚合)，
+  观察首轮之后的重跑是否只剩渲染开销、内存是否随会话数线性增长
+- 进程间：--processes 个工作进程同时压同一个 CSV 服务，相当于多副本部署的并发
+
+用法：python -m benchmarks.load_test --students 5000 --processes 4 --sessions 4 --rounds 3
+"""
+import argparse
+import functools
+import http.server
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import textwrap
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from benchmarks.synthetic import write_dataset
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+# AppTest 无法操作 option_menu 这类自定义组件：压测入口里把它换成读 session_state 的函数，再执行真正的 app.py
+_ENTRY = textwrap.dedent("""
+    import streamlit as st
+    import streamlit_option_menu
+    streamlit_option_menu.option_menu = lambda *a, **k: st.session_state.get('_nav', '成绩总览')
+    __file__ = {app!r}
+    exec(compile(open(__file__, encoding='utf-8').read(), __file__, 'exec'))
+""")
+
+
+_run_lock = threading.Lock()
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve(directory):
+    """在随机端口上起一个静态文件服务，返回 (服务对象, 根 URL)"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def session(entry, base, student, rounds, timings):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(entry, default_timeout=120)
+    at.secrets.update({'ADMIN_PWD': 'bench', 'URL_SCORE_PHYSICS': base + 'physics.csv', 'URL_SCORE_HISTORY': base + 'history.csv',
+                       'URL_DETAIL_PHYSICS': base + 'd_physics.csv', 'URL_DETAIL_MATH': base + 'd_math.csv'})
+
+    def run(step):
+        with _run_lock:
+            t0 = time.perf_counter()
+            at.run()
+            timings.setdefault(step, []).append((time.perf_counter() - t0) * 1000)
+        if at.exception: raise RuntimeError(f"{step}: {at.exception[0].value}")
+
+    for _ in range(rounds):
+        at.session_state['_nav'] = '成绩总览'
+        at.session_state['logged_in_student'], at.session_state['logged_in_id'] = student
+        at.session_state['logged_in_direction'] = '物理方向'
+        run('student.overview')
+        at.session_state['_nav'] = '深度诊断'
+        run('student.diagnosis')
+        at.selectbox[0].set_value('📐 数学')
+        run('student.diagnosis.switch')
+        at.session_state['logged_in_student'] = None
+        at.session_state['_nav'] = '教师后台'
+        at.session_state['is_admin'] = True
+        run('admin.class_pk')
+        at.radio[0].set_value('📈 学情总览')
+        run('admin.overview')
+        at.session_state['is_admin'] = False
+        at.session_state['is_teacher'], at.session_state['teacher_subject'] = True, '⚡ 物理'
+        run('teacher.compare')
+        at.radio[0].set_value(at.radio[0].options[1])
+        run('teacher.diagnosis')
+        at.session_state['is_teacher'] = False
+
+
+def worker(entry, base, students, rounds):
+    """一个工作进程：若干会话交替运行，返回 (各步骤耗时, 常驻内存增长 MB)"""
+    rss0, timings = rss_mb(), {}
+    with ThreadPoolExecutor(max_workers=len(students)) as pool:
+        for fut in [pool.submit(session, entry, base, s, rounds, timings) for s in students]:
+            fut.result()
+    return timings, rss_mb() - rss0
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="AppTest 并发会话压测")
+    ap.add_argument('--students', type=int, default=5000)
+    ap.add_argument('--processes', type=int, default=2, help="并行的工作进程数")
+    ap.add_argument('--sessions', type=int, default=4, help="每个进程里的会话数")
+    ap.add_argument('--rounds', type=int, default=2)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(os.path.join(tmp, 'data'), args.students)
+        entry = os.path.join(tmp, 'entry.py')
+        with open(entry, 'w', encoding='utf-8') as f:
+            f.write(_ENTRY.format(app=APP))
+        os.environ.setdefault('SHEET_CACHE_DIR', os.path.join(tmp, 'sheet_cache'))
+        os.environ.setdefault('AI_CACHE_PATH', os.path.join(tmp, 'ai_cache', 'advice.sqlite3'))
+        server, base = serve(os.path.join(tmp, 'data'))
+        total = args.processes * args.sessions
+        students = [(f"学生{i}", f"2024{i:06d}") for i in range(0, args.students, max(1, args.students // total))][:total]
+        timings, growth = {}, []
+        t0 = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = [pool.submit(worker, entry, base, students[i::args.processes], args.rounds) for i in range(args.processes)]
+                for fut in futures:
+                    part, rss = fut.result()
+                    growth.append(rss)
+                    for step, values in part.items(): timings.setdefault(step, []).extend(values)
+        finally:
+            server.shutdown()
+        wall = time.perf_counter() - t0
+
+    print(f"{args.processes} processes × {args.sessions} sessions × {args.rounds} rounds, {args.students} students, wall {wall:.1f}s")
+    print(f"max RSS growth per process: {', '.join(f'{g:.0f}' for g in growth)} MB")
+    print(f"{'step':<28}{'runs':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for step, values in timings.items():
+        print(f"{step:<28}{len(values):>6}{statistics.median(values):>10.1f}{pct(values, 95):>10.1f}{max(values):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+合成考试数据生成器：生成与 app.py 读取格式一致的成绩总表和单科明细表 (CSV)
+
+- 成绩总表：序号, 班级, 姓名, 考号, 各科, 总分, 班级排名 (单行表头)
+- 单科明细表：班级, 姓名, 考号, 第1题... ；第二行为知识点，第三行为满分 (三行表头)
+- 同一批学生在总表和明细表里姓名/考号一致；得分与学生"能力"相关，区分度、名次等统计量有意义
+
+用法：python -m benchmarks.synthetic 输出目录 --students 1000 --classes 20 --questions 40 --kps 12
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+SUBJECTS = {
+    '物理方向': ['语文', '数学', '英语', '物理', '化学', '生物'],
+    '历史方向': ['语文', '数学', '英语', '历史', '地理', '政治'],
+}
+FULL_MARKS = {'语文': 150, '数学': 150, '英语': 150}
+
+
+def make_cohort(n_students, n_classes=20, seed=0):
+    """学生名单：班级、姓名、考号 (字符串，保留前导零) 与一个隐含的能力值"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        '班级': [f"{c}班" for c in rng.integers(1, n_classes + 1, n_students)],
+        '姓名': [f"学生{i}" for i in range(n_students)],
+        '考号': [f"2024{i:06d}" for i in range(n_students)],
+        'ability': rng.normal(0, 1, n_students),
+    })
+
+
+def score_sheet(cohort, direction='物理方向', seed=0):
+    rng = np.random.default_rng(seed + 1)
+    df = pd.DataFrame({'序号': np.arange(1, len(cohort) + 1), '班级': cohort['班级'], '姓名': cohort['姓名'], '考号': cohort['考号']})
+    for sub in SUBJECTS[direction]:
+        full = FULL_MARKS.get(sub, 100)
+        ratio = 1 / (1 + np.exp(-(cohort['ability'].to_numpy() * 1.2 + rng.normal(0.6, 0.6, len(cohort)))))
+        df[sub] = np.round(ratio * full).astype(int)
+    df['总分'] = df[SUBJECTS[direction]].sum(axis=1)
+    df['班级排名'] = df.groupby('班级')['总分'].rank(ascending=False, method='min').astype(int)
+    return df
+
+
+def detail_sheet(cohort, n_questions=40, n_kps=12, seed=0):
+    """单科明细表的 CSV 文本 (三行表头)"""
+    rng = np.random.default_rng(seed + 2)
+    kps = [f"知识点{k + 1}" for k in rng.integers(0, n_kps, n_questions)]
+    full = rng.choice([3, 4, 5, 6, 8, 10, 12], n_questions)
+    difficulty = rng.normal(0, 1, n_questions)
+    p = 1 / (1 + np.exp(-(cohort['ability'].to_numpy()[:, None] * rng.uniform(0.5, 2, n_questions) - difficulty)))
+    scores = np.round(p * full + rng.normal(0, 0.5, p.shape)).clip(0, full).astype(int)
+    head = [['班级', '姓名', '考号'] + [f"第{i + 1}题" for i in range(n_questions)], ['', '', ''] + kps, ['', '', ''] + [str(f) for f in full]]
+    body = pd.DataFrame(scores)
+    body.insert(0, '考号', cohort['考号'])
+    body.insert(0, '姓名', cohort['姓名'])
+    body.insert(0, '班级', cohort['班级'])
+    return "\n".join(",".join(r) for r in head) + "\n" + body.to_csv(index=False, header=False)
+
+
+def write_dataset(out_dir, n_students, n_classes=20, n_questions=40, n_kps=12, detail_subjects=('physics', 'math'), seed=0):
+    """
+    在 out_dir 下写出两张总表和若干明细表，返回 {名称: 文件路径}：
+    physics.csv, history.csv, d_<科目>.csv (科目名对应 secrets 里的 URL_DETAIL_<科目大写>)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cohort = make_cohort(n_students, n_classes, seed)
+    paths = {}
+    for name, direction in (('physics', '物理方向'), ('history', '历史方向')):
+        paths[name] = os.path.join(out_dir, f"{name}.csv")
+        score_sheet(cohort, direction, seed).to_csv(paths[name], index=False)
+    for i, sub in enumerate(detail_subjects):
+        paths[f"d_{sub}"] = os.path.join(out_dir, f"d_{sub}.csv")
+        with open(paths[f"d_{sub}"], 'w', encoding='utf-8') as f:
+            f.write(detail_sheet(cohort, n_questions, n_kps, seed + 10 * (i + 1)))
+    return paths
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description="生成合成成绩总表与单科明细表")
+    ap.add_argument('out_dir')
+    ap.add_argument('--students', type=int, default=1000)
+    ap.add_argument('--classes', type=int, default=20)
+    ap.add_argument('--questions', type=int, default=40)
+    ap.add_argument('--kps', type=int, default=12)
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+    for name, path in write_dataset(args.out_dir, args.students, args.classes, args.questions, args.kps, seed=args.seed).items():
+        print(f"{name}: {path}")
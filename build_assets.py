@@ -0,0 +1,34 @@
+"""
+登录页动画素材预处理：GIF -> 动态 WebP + 首帧海报
+
+    python build_assets.py
+
+产物写入 static/，由 Streamlit 静态文件服务 (.streamlit/config.toml 中的 server.enableStaticServing) 直接提供。
+静态路由只带 ETag、不发 Cache-Control：浏览器每次打开页面仍会条件请求一次，内容未变时只回 304，不再每次渲染都经 Streamlit 重新下发几 MB 的 GIF。
+需要 Pillow (pip install pillow)。
+"""
+import os
+
+from PIL import Image, ImageSequence
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+SOURCES = ["panda.gif", "star.gif"]
+
+
+def build(src, quality=65):
+    name = os.path.splitext(os.path.basename(src))[0]
+    with Image.open(src) as im:
+        frames = [f.convert("RGBA") for f in ImageSequence.Iterator(im)]
+        durations = [f.info.get("duration", 70) for f in ImageSequence.Iterator(im)]
+    anim = os.path.join(STATIC_DIR, f"{name}.webp")
+    poster = os.path.join(STATIC_DIR, f"{name}_poster.webp")
+    frames[0].save(anim, save_all=True, append_images=frames[1:], duration=durations, loop=0, quality=quality, method=6)
+    frames[0].save(poster, quality=50, method=6)
+    print(f"{src}: {os.path.getsize(src) // 1024} KB -> {name}.webp {os.path.getsize(anim) // 1024} KB, {name}_poster.webp {os.path.getsize(poster) // 1024} KB")
+
+
+if __name__ == "__main__":
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    for src in SOURCES:
+        build(os.path.join(ROOT, src))
@@ -0,0 +1,49 @@
+"""
+学生端图表：成绩总览的各科柱状图/雷达图、深度诊断的知识点雷达图
+
+页面和批量导出报告共用同一套图，保证两边看到的一致。
+"""
+import pandas as pd
+
+import metrics
+
+
+@metrics.timed('figure.subject_bar')
+def subject_bar(subject_scores):
+    """[(科目, 得分)] -> 各科得分柱状图"""
+    import plotly.express as px
+    fig = px.bar(pd.DataFrame(subject_scores, columns=["科目", "得分"]), x='科目', y='得分', text_auto=True, color='科目')
+    fig.update_layout(showlegend=False, margin=dict(t=40, b=20, l=20, r=20), paper_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+@metrics.timed('figure.subject_radar')
+def subject_radar(subject_scores):
+    import plotly.express as px
+    fig = px.line_polar(pd.DataFrame(subject_scores, columns=["科目", "得分"]), r='得分', theta='科目', line_close=True)
+    fig.update_traces(fill='toself', line_color='#0068C9')
+    fig.update_layout(margin=dict(t=40, b=20, l=40, r=40), paper_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+@metrics.timed('figure.knowledge_radar')
+def knowledge_radar(k_data):
+    """[{'知识点', '我的掌握率', '班级平均'}] -> 我的掌握率 vs 班级平均 雷达图"""
+    import plotly.graph_objects as go
+    cats = [r['知识点'] for r in k_data] + [k_data[0]['知识点']]
+    mys = [r['我的掌握率'] for r in k_data] + [k_data[0]['我的掌握率']]
+    avgs = [r['班级平均'] for r in k_data] + [k_data[0]['班级平均']]
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(r=avgs, theta=cats, fill='toself', name='班级平均', line_color='#cccccc'))
+    fig.add_trace(go.Scatterpolar(r=mys, theta=cats, fill='toself', name='我的掌握', line_color='#FF4B4B'))
+    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])), paper_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+def knowledge_rows(kmap, row):
+    """知识点矩阵的第 row 个学生 -> (k_data, 薄弱知识点, 优势知识点)，判定规则：低于班级平均即为薄弱"""
+    k_data, weak, strong = [], [], []
+    for kp, my_rate, avg_rate in zip(kmap['kps'], kmap['my_rates'][row].tolist(), kmap['avg_rates'].tolist()):
+        k_data.append({'知识点': kp, '我的掌握率': my_rate, '班级平均': avg_rate})
+        (weak if my_rate < avg_rate else strong).append(kp)
+    return k_data, weak, strong
@@ -0,0 +1,193 @@
+"""
+热点路径埋点：计时区间、缓存命中/未命中计数、按需采集的指标 (如每张表的内存占用)
+
+- span(stage)：计时区间，每个阶段保留最近 WINDOW 个样本，用于滚动 p50/p95；累计次数和总耗时另记
+- cached(name, cache)：包住 st.cache_data / st.cache_resource，统计命中/未命中，未命中时计入 compute.<name> 区间
+- gauge(name, fn)：导出时才调用 fn 取值 (返回 {标签: 数值})
+- 导出：summary() 给页面表格；prometheus() 为 Prometheus 文本格式；serve(port) 起一个 /metrics 端点
+- 结构化日志：每个区间以 JSON 写到 yhxx.metrics 日志 (DEBUG)，超过 SLOW_S 的升为 INFO
+"""
+import functools
+import http.server
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger('yhxx.metrics')
+
+WINDOW = 1000
+SLOW_S = 1.0
+
+
+class Registry:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = defaultdict(lambda: [0, 0.0])
+        self._cache = defaultdict(lambda: {'hit': 0, 'miss': 0})
+        self._gauges = {}
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+    def observe(self, stage, seconds, **labels):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            total = self._totals[stage]
+            total[0] += 1
+            total[1] += seconds
+        if logger.isEnabledFor(logging.INFO if seconds >= SLOW_S else logging.DEBUG):
+            logger.log(logging.INFO if seconds >= SLOW_S else logging.DEBUG, json.dumps({'stage': stage, 'ms': round(seconds * 1000, 2), **labels}, ensure_ascii=False, default=str))
+
+    @contextmanager
+    def span(self, stage, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0, **labels)
+
+    def timed(self, stage):
+        """函数装饰器版的 span"""
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def cache_event(self, name, hit):
+        with self._lock:
+            self._cache[name]['hit' if hit else 'miss'] += 1
+
+    def cached(self, name, cache):
+        """
+        用法：@registry.cached("score_aggregates", st.cache_resource(max_entries=64))
+        外层统计调用、内层只在真正计算时执行，两者一比就是命中/未命中；嵌套的缓存函数各记各的。
+        """
+        local = threading.local()
+
+        def deco(fn):
+            @functools.wraps(fn)
+            def compute(*args, **kwargs):
+                stack = getattr(local, 'stack', None)
+                if stack: stack[-1] = True
+                with self.span(f"compute.{name}"):
+                    return fn(*args, **kwargs)
+
+            cached_fn = cache(compute)
+
+            @functools.wraps(fn)
+            def call(*args, **kwargs):
+                if not hasattr(local, 'stack'): local.stack = []
+                local.stack.append(False)
+                try:
+                    return cached_fn(*args, **kwargs)
+                finally:
+                    self.cache_event(name, hit=not local.stack.pop())
+            call.clear = getattr(cached_fn, 'clear', None)
+            return call
+        return deco
+
+    def gauge(self, name, fn, help=""):
+        """注册按需取值的指标；fn() 返回 {标签值: 数值}"""
+        with self._lock:
+            self._gauges[name] = (fn, help)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._cache.clear()
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+    def _stats(self):
+        with self._lock:
+            snap = {k: (np.asarray(v), tuple(self._totals[k])) for k, v in self._samples.items()}
+        for stage, (s, (count, total)) in sorted(snap.items()):
+            if len(s): yield stage, s, count, total
+
+    def summary(self):
+        """[{'stage', 'count', 'p50_ms', 'p95_ms', 'max_ms', 'last_ms', 'total_s'}]，p50/p95/max 取最近 window 个样本"""
+        rows = []
+        for stage, s, count, total in self._stats():
+            p50, p95, peak, last = (np.array([*np.percentile(s, [50, 95]), s.max(), s[-1]]) * 1000).tolist()
+            rows.append({'stage': stage, 'count': count, 'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2),
+                         'max_ms': round(peak, 2), 'last_ms': round(last, 2), 'total_s': round(total, 3)})
+        return rows
+
+    def cache_stats(self):
+        with self._lock:
+            stats = {k: dict(v) for k, v in self._cache.items()}
+        return [{'cache': k, 'hit': v['hit'], 'miss': v['miss'], 'hit_rate': round(v['hit'] / (v['hit'] + v['miss']), 3) if v['hit'] + v['miss'] else None}
+                for k, v in sorted(stats.items())]
+
+    def gauges(self):
+        with self._lock:
+            gauges = dict(self._gauges)
+        values = {}
+        for name, (fn, _) in gauges.items():
+            try: values[name] = fn()
+            except Exception as e:
+                logger.warning("gauge %s failed: %s", name, e)
+        return values
+
+    def prometheus(self, prefix='yhxx'):
+        esc = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, s, count, total in self._stats():
+            stage = esc(stage)
+            p50, p95 = np.percentile(s, [50, 95])
+            lines += [f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.5"}} {p50:.6f}',
+                      f'{prefix}_stage_seconds{{stage="{stage}",quantile="0.95"}} {p95:.6f}',
+                      f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}',
+                      f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}']
+        lines.append(f"# TYPE {prefix}_cache_requests_total counter")
+        for r in self.cache_stats():
+            for result in ('hit', 'miss'):
+                lines.append(f'{prefix}_cache_requests_total{{cache="{esc(r["cache"])}",result="{result}"}} {r[result]}')
+        for name, values in self.gauges().items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines += [f'{prefix}_{name}{{key="{esc(k)}"}} {v}' for k, v in values.items()]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        在后台线程里起 Prometheus 抓取端点 http://host:port/metrics。
+        端点不做鉴权，默认只监听本机；需要跨机抓取时显式传 host，并在网络层限制来源。
+        """
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True, name='metrics-http').start()
+        logger.info("metrics endpoint on %s:%s/metrics", host, port)
+        return server
+
+
+registry = Registry()
+span = registry.span
+timed = registry.timed
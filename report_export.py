@@ -0,0 +1,172 @@
+"""
+全年级学生报告批量导出
+
+- 主进程把每个学生的成绩总览 + 各科深度诊断整理成纯数据 (build_payloads)，顺带查好已缓存的 AI 提分建议
+- 渲染 (画图 + 拼 HTML) 分块交给进程池，图表与页面共用 charts 里的同一套
+- 结果打成 ZIP：每个学生一个 HTML 文件，外加一个索引页；HTML 自带打印样式，浏览器里"打印 → 另存为 PDF"即可
+
+子进程用 spawn 启动，不继承 Streamlit 服务进程里的线程和锁；
+Streamlit 把页面脚本装成 __main__，spawn 默认会在子进程里重跑 __main__，启动子进程期间临时换成空模块。
+"""
+import html
+import io
+import logging
+import multiprocessing
+import os
+import re
+import sys
+import time
+import types
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
+
+import charts
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def plotly_cdn():
+    """与已安装 plotly 配套的 plotly.js 版本的 CDN 地址：图表 JSON 按该版本写出，报告页必须加载同一版本"""
+    from plotly.offline import get_plotlyjs_version
+    return f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"
+
+_PAGE = """<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>{title}</title>
+<script src="{cdn}"></script>
+<style>
+body {{ font-family: "PingFang SC", "Microsoft YaHei", sans-serif; max-width: 960px; margin: 24px auto; color: #1f2937; }}
+h1 {{ color: #0068C9; }} h2 {{ border-left: 6px solid #0068C9; padding-left: 10px; margin-top: 32px; }}
+table {{ border-collapse: collapse; width: 100%; }} th, td {{ border: 1px solid #e5e7eb; padding: 4px 8px; text-align: center; }}
+.row {{ display: flex; gap: 12px; }} .row > div {{ flex: 1; min-width: 0; }}
+.ai-box {{ background: #f0f7ff; border-left: 5px solid #0068C9; padding: 12px 16px; white-space: pre-wrap; }}
+section {{ page-break-inside: avoid; }} @media print {{ body {{ margin: 0; }} .subject {{ page-break-before: always; }} }}
+</style></head><body>
+{body}
+</body></html>"""
+
+
+def _fmt(v):
+    if v is None: return "-"
+    if isinstance(v, float): return str(int(v)) if v.is_integer() else f"{round(v, 2):g}"
+    return str(v)
+
+
+def _plain(v):
+    """numpy / pandas 标量 -> Python 标量，保证能跨进程传递"""
+    if v is None: return None
+    try:
+        import pandas as pd
+        if pd.isna(v): return None
+    except (TypeError, ValueError):
+        pass
+    return v.item() if hasattr(v, 'item') else v
+
+
+def build_payloads(df, direction, ranks=None, subjects=None, advice=None):
+    """
+    整理每个学生的报告数据 (纯 Python 结构，可跨进程传递)。
+    subjects: {科目名: (学生索引, 知识点矩阵)}；advice(科目, 薄弱串, 优势串) -> 已缓存的建议文本或 None。
+    """
+    from analytics import student_subject_scores
+    subjects = subjects or {}
+    payloads = []
+    for row in range(len(df)):
+        stu = df.iloc[row]
+        name, sid = str(stu.get('姓名', '')).strip(), str(stu.get('考号', stu.get('学号', ''))).strip()
+        diagnoses = []
+        for sub_name, (index, kmap) in subjects.items():
+            found = index.get((name, sid), -1) if index else -1
+            if found == -1 or not kmap: continue
+            k_data, weak, strong = charts.knowledge_rows(kmap, found)
+            if not k_data: continue
+            w_str, s_str = "、".join(weak) or "无", "、".join(strong) or "无"
+            diagnoses.append({'subject': sub_name, 'k_data': k_data, 'weak': weak, 'advice': advice(sub_name, w_str, s_str) if advice else None})
+        payloads.append({
+            'name': name, 'id': sid, 'direction': direction, 'class': _plain(stu.get('班级')),
+            'total': _plain(stu.get('总分')), 'class_rank': _plain(stu.get('班级排名')),
+            'scores': [(c, _plain(v)) for c, v in student_subject_scores(df, stu)],
+            'standing': [tuple(_plain(x) for x in r) for r in ranks.standing(stu)] if ranks is not None else [],
+            'diagnoses': diagnoses,
+        })
+    return payloads
+
+
+def file_name(p):
+    safe = re.sub(r'[\\/:*?"<>|\s]+', '_', f"{p['class'] or ''}_{p['name']}_{p['id']}").strip('_')
+    return f"{safe}.html"
+
+
+def render_report(p):
+    """单个学生 -> 完整 HTML 文本"""
+    e = html.escape
+    fig = lambda f: f.to_html(full_html=False, include_plotlyjs=False, config={'displayModeBar': False})
+    parts = [f"<h1>{e(p['name'])} 的考试学情报告</h1>",
+             f"<p>考号：{e(p['id'])} ｜ 方向：{e(p['direction'])} ｜ 班级：{e(_fmt(p['class']))} ｜ 总分：<b>{e(_fmt(p['total']))}</b> ｜ 班级排名：{e(_fmt(p['class_rank']))}</p>"]
+    if p['scores']:
+        parts.append(f"<section><h2>📊 各科得分对比</h2><div class='row'><div>{fig(charts.subject_bar(p['scores']))}</div><div>{fig(charts.subject_radar(p['scores']))}</div></div></section>")
+    if p['standing']:
+        rows = "".join(f"<tr><td>{e(str(c))}</td><td>{_fmt(v)}</td><td>{_fmt(g)}</td><td>{_fmt(k)}</td><td>{_fmt(pct)}%</td></tr>" for c, v, g, k, pct in p['standing'])
+        parts.append(f"<section><h2>🧭 年级 / 班级位次</h2><table><tr><th>科目</th><th>得分</th><th>年级排名</th><th>班级排名</th><th>超过全年级</th></tr>{rows}</table></section>")
+    for d in p['diagnoses']:
+        lag = "".join(f"<li><b>{e(r['知识点'])}</b> (落后 {r['班级平均'] - r['我的掌握率']:.1f}%)</li>" for r in d['k_data'] if r['知识点'] in d['weak'])
+        parts.append(f"<section class='subject'><h2>🩺 {e(d['subject'])} 深度诊断</h2><div class='row'><div>{fig(charts.knowledge_radar(d['k_data']))}</div>"
+                     f"<div><h3>专家系统诊断</h3>{f'<ul>{lag}</ul>' if lag else '<p>🎉 所有知识点均达标！</p>'}</div></div>"
+                     + (f"<div class='ai-box'><b>AI导师：</b><br><br>{e(d['advice'])}</div>" if d['advice'] else "") + "</section>")
+    return _PAGE.format(title=e(f"{p['name']} 考试学情报告"), cdn=plotly_cdn(), body="\n".join(parts))
+
+
+def _render_chunk(chunk):
+    return [(file_name(p), render_report(p)) for p in chunk]
+
+
+def _index_page(payloads):
+    rows = "".join(f"<tr><td>{html.escape(_fmt(p['class']))}</td><td><a href='{html.escape(file_name(p))}'>{html.escape(p['name'])}</a></td>"
+                   f"<td>{html.escape(p['id'])}</td><td>{_fmt(p['total'])}</td></tr>" for p in payloads)
+    body = f"<h1>学生报告目录 ({len(payloads)} 人)</h1><table><tr><th>班级</th><th>姓名</th><th>考号</th><th>总分</th></tr>{rows}</table>"
+    return _PAGE.format(title="学生报告目录", cdn=plotly_cdn(), body=body)
+
+
+@contextmanager
+def _bare_main():
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def export_reports(payloads, max_workers=None, chunk_size=25, on_progress=None):
+    """
+    渲染全部报告并打成 ZIP。max_workers 为 0 时在当前进程里渲染 (调试/小批量)。
+    返回 (zip 字节, {'students', 'files', 'seconds'})。
+    """
+    t0 = time.monotonic()
+    chunks = [payloads[i:i + chunk_size] for i in range(0, len(payloads), chunk_size)]
+    buf = io.BytesIO()
+    done = 0
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        def write(files):
+            nonlocal done
+            for name, page in files:
+                zf.writestr(name, page)
+            done += len(files)
+            if on_progress: on_progress(done, len(payloads))
+
+        if max_workers == 0:
+            for c in chunks: write(_render_chunk(c))
+        else:
+            workers = min(max_workers or os.cpu_count() or 1, len(chunks)) or 1
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                # 子进程在 submit 时按需启动，全部提交完再恢复 __main__
+                with _bare_main():
+                    futures = [pool.submit(_render_chunk, c) for c in chunks]
+                for fut in as_completed(futures):
+                    write(fut.result())
+        zf.writestr("index.html", _index_page(payloads))
+    summary = {'students': len(payloads), 'files': len(payloads) + 1, 'seconds': round(time.monotonic() - t0, 1)}
+    logger.info("report export: %s", summary)
+    return buf.getvalue(), summary
@@ -0,0 +1,252 @@
+"""
+远程成绩表加载器 (stale-while-revalidate)
+
+- 有旧数据时立即返回，过期 (ttl) 后在后台用 ETag / If-Modified-Since 条件请求重新校验；304 或内容哈希不变时不重新解析
+- 同一张表的并发刷新合并为一次请求；每张表维护递增的版本号，下游缓存以版本号为键
+- 可选挂载本地快照 (snapshot_store)；prefetch 在启动时并发预取全部表格并报告耗时与失败原因
+- 每张表在进程内只有一份；get 交出写时复制的浅视图，调用方改列碰不到共享的那一份
+"""
+import hashlib
+import io
+import logging
+import threading
+import time
+import types
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# pandas 3 起默认写时复制；2.x 需显式打开，否则浅视图上的赋值会写穿到共享表
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+
+@dataclass(frozen=True)
+class SheetSnapshot:
+    """某张表最近一次成功解析的结果及其校验信息"""
+    df: object = None
+    version: int = 0
+    etag: str = None
+    last_modified: str = None
+    digest: str = None
+    checked_at: float = float('-inf')
+    # 最近一次校验的情况：下载/解析耗时 (秒)、结果 (downloaded / not_modified / unchanged / failed)、失败原因
+    fetch_s: float = None
+    parse_s: float = None
+    outcome: str = None
+    error: str = None
+
+
+def _norm_header(header):
+    return tuple(header) if isinstance(header, (list, tuple)) else header
+
+
+def _redact(url):
+    """日志里代替表格地址的短标识：发布的 CSV 地址本身就是读取全体学生成绩的凭据，不能写进日志"""
+    return "sheet:" + hashlib.sha1(url.encode('utf-8')).hexdigest()[:10]
+
+
+def freeze(obj):
+    """
+    把派生结果 (学生索引、知识点矩阵等) 变成可以跨会话共享的只读对象：
+    ndarray 关闭写标志，dict 包成只读映射，list 转 tuple；DataFrame 交出浅视图 (写时复制)。
+    """
+    if isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+        return obj
+    if isinstance(obj, pd.DataFrame): return obj.copy(deep=False)
+    if isinstance(obj, dict): return types.MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list): return tuple(obj)
+    return obj
+
+
+def read_csv(source, header=0):
+    return pd.read_csv(source, header=list(header) if isinstance(header, tuple) else header, on_bad_lines='skip')
+
+
+class SheetLoader:
+    def __init__(self, ttl=600, timeout=20, max_workers=4, store=None, parse=read_csv):
+        self.ttl = ttl
+        self.timeout = timeout
+        self.store = store
+        self.parse = parse
+        self._snapshots = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._restore_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sheet-refresh')
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    def get(self, url, header=0):
+        """
+        返回 (DataFrame 或 None, 版本号)。有可用数据时从不阻塞，过期只触发后台刷新。
+        DataFrame 是共享表的写时复制浅视图：不拷贝数据，调用方的修改也不会影响其他会话。
+        """
+        key = (url.strip(), _norm_header(header))
+        with self._lock:
+            snap = self._snapshots.get(key)
+        if snap is None and self.store is not None:
+            snap = self._restore(key)
+        blocking = snap is None or (snap.df is None and self._is_stale(snap))
+        metrics.registry.cache_event('sheet_snapshot', hit=not blocking)
+        if blocking:
+            # 首次加载 (或上次失败且已过期)：没有可返回的数据，只能等待
+            self._refresh(key).result()
+            with self._lock:
+                snap = self._snapshots[key]
+        elif self._is_stale(snap):
+            self._refresh(key)
+        return (snap.df.copy(deep=False) if snap.df is not None else None), snap.version
+
+    def version(self, url, header=0):
+        with self._lock:
+            snap = self._snapshots.get((url.strip(), _norm_header(header)))
+        return snap.version if snap else 0
+
+    def footprint(self, sheets):
+        """
+        {名称: (url, header)} 中已加载的表当前快照的内存占用 (字节)：{名称: bytes}；字符串列按实际内容计算。
+        以调用方给的名称为键，表格地址不外露。
+        """
+        with self._lock:
+            snaps = {name: self._snapshots.get((url.strip(), _norm_header(header))) for name, (url, header) in sheets.items() if url and url.strip()}
+        return {name: int(snap.df.memory_usage(deep=True).sum()) for name, snap in snaps.items() if snap is not None and snap.df is not None}
+
+    def refresh(self, url, header=0):
+        """立即发起 (合并后的) 重新校验，返回 Future"""
+        return self._refresh((url.strip(), _norm_header(header)))
+
+    def prefetch(self, sheets):
+        """
+        后台并发预取 {名称: (url, header)}，并发度即刷新线程池大小，调用方不阻塞。
+        返回 Future，结果为逐表报告 [{'sheet', 'ok', 'outcome', 'fetch_s', 'parse_s', 'rows', 'version', 'error', 'validation'}]。
+        validation 为解析函数写在 df.attrs['validation'] 里的校验摘要 (没有则为 None)。
+        """
+        report = Future()
+        threading.Thread(target=self._prefetch, args=(sheets, report), daemon=True, name='sheet-prefetch').start()
+        return report
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _is_stale(self, snap):
+        return time.monotonic() - snap.checked_at >= self.ttl
+
+    def _restore(self, key):
+        """进程内首次访问时从本地快照恢复；恢复出的数据视为已过期，会立即后台校验"""
+        with self._restore_lock:
+            with self._lock:
+                snap = self._snapshots.get(key)
+            if snap is None:
+                snap = self.store.load(*key)
+                if snap is not None: self._publish(key, snap)
+        return snap
+
+    def _prefetch(self, sheets, report):
+        try:
+            pending = []
+            for name, (url, header) in sheets.items():
+                if not url or not url.strip(): continue
+                key = (url.strip(), _norm_header(header))
+                with self._lock:
+                    snap = self._snapshots.get(key)
+                if snap is None and self.store is not None:
+                    snap = self._restore(key)
+                pending.append((name, key, self._refresh(key) if snap is None or self._is_stale(snap) else None))
+            rows = []
+            for name, key, fut in pending:
+                if fut is not None: fut.result()
+                with self._lock:
+                    snap = self._snapshots[key]
+                validation = snap.df.attrs.get('validation') if snap.df is not None else None
+                rows.append({'sheet': name, 'ok': snap.df is not None, 'outcome': snap.outcome, 'fetch_s': snap.fetch_s, 'parse_s': snap.parse_s,
+                             'rows': len(snap.df) if snap.df is not None else 0, 'version': snap.version, 'error': snap.error, 'validation': validation})
+                if snap.error: logger.warning("prefetch %s failed: %s", name, snap.error)
+                elif validation and (validation.get('invalid_cells') or validation.get('missing')):
+                    logger.warning("prefetch %s: %s invalid cells %s, missing columns %s", name, validation.get('invalid_cells'),
+                                   [(c['column'], c['invalid']) for c in validation.get('columns', [])], validation.get('missing'))
+                else: logger.info("prefetch %s: %s fetch=%.3fs parse=%s", name, snap.outcome, snap.fetch_s or 0, f"{snap.parse_s:.3f}s" if snap.parse_s is not None else "-")
+            report.set_result(rows)
+        except Exception as e:
+            report.set_exception(e)
+
+    def _refresh(self, key):
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is None:
+                fut = self._pool.submit(self._revalidate, key)
+                self._inflight[key] = fut
+        return fut
+
+    def _revalidate(self, key):
+        try:
+            self._fetch(key)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fetch(self, key):
+        url, header = key
+        with self._lock:
+            snap = self._snapshots.get(key, SheetSnapshot())
+        t0 = time.monotonic()
+        try:
+            body, etag, last_modified = self._download(url, snap)
+        except Exception as e:
+            logger.warning("sheet fetch failed: %s (%s)", _redact(url), e)
+            now = time.monotonic()
+            self._publish(key, replace(snap, checked_at=now, fetch_s=now - t0, parse_s=None, outcome='failed', error=str(e)))
+            return
+        now = time.monotonic()
+        metrics.registry.observe('sheet.fetch', now - t0)
+        fetched = dict(etag=etag, last_modified=last_modified, checked_at=now, fetch_s=now - t0, parse_s=None, error=None)
+        if body is None:
+            self._publish(key, replace(snap, outcome='not_modified', **fetched))
+            return
+        digest = hashlib.sha256(body).hexdigest()
+        if digest == snap.digest and snap.df is not None:
+            self._publish(key, replace(snap, outcome='unchanged', **fetched))
+            return
+        try:
+            df = self.parse(io.BytesIO(body), header)
+        except Exception as e:
+            logger.warning("sheet parse failed: %s (%s)", _redact(url), e)
+            self._publish(key, replace(snap, checked_at=now, fetch_s=now - t0, parse_s=time.monotonic() - now, outcome='failed', error=str(e)))
+            return
+        snap = SheetSnapshot(df=df, version=snap.version + 1, etag=etag, last_modified=last_modified, digest=digest, checked_at=now,
+                             fetch_s=now - t0, parse_s=time.monotonic() - now, outcome='downloaded')
+        metrics.registry.observe('sheet.parse', snap.parse_s, rows=len(df))
+        self._publish(key, snap)
+        if self.store is not None:
+            self.store.save(url, header, snap)
+
+    def _publish(self, key, snap):
+        with self._lock:
+            self._snapshots[key] = snap
+
+    def _download(self, url, snap):
+        """返回 (body, etag, last_modified)；body 为 None 表示 304 未修改"""
+        if not url.lower().startswith(('http://', 'https://')):
+            with open(url, 'rb') as f:
+                return f.read(), None, None
+        req = urllib.request.Request(url, headers={'User-Agent': 'yhxx-sheet-loader'})
+        if snap.df is not None:
+            if snap.etag: req.add_header('If-None-Match', snap.etag)
+            if snap.last_modified: req.add_header('If-Modified-Since', snap.last_modified)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.read(), resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and snap.df is not None:
+                return None, e.headers.get('ETag') or snap.etag, e.headers.get('Last-Modified') or snap.last_modified
+            raise
@@ -0,0 +1,84 @@
+"""
+成绩表本地快照 (Arrow IPC 列式文件)
+
+每张表解析成功后写一份快照到本地磁盘，进程重启后直接内存映射读取，
+无需重新下载、重新解析三行表头。快照里同时保存 ETag / Last-Modified / 内容哈希，
+重启后的首次校验仍然是条件请求，远端没变就不会重新下载。
+
+列的 dtype (分类、float32、可空整数) 和 df.attrs 一并保存；tag 标识解析规则的版本，
+规则变了旧快照自然失效，重新下载解析。
+
+pyarrow 未安装时快照功能自动关闭，不影响正常加载。
+"""
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+from sheet_loader import SheetSnapshot
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+_META_KEY = b'yhxx.sheet'
+
+
+class SnapshotStore:
+    def __init__(self, root, tag=None):
+        self.root = root
+        self.tag = tag
+        self.enabled = pa is not None
+        if self.enabled:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, url, header):
+        name = hashlib.sha1(json.dumps([url, header, self.tag], ensure_ascii=False).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, f"{name}.arrow")
+
+    def load(self, url, header):
+        """读取快照并恢复成 SheetSnapshot；不存在或损坏时返回 None"""
+        if not self.enabled: return None
+        path = self._path(url, header)
+        if not os.path.exists(path): return None
+        try:
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            meta = json.loads(table.schema.metadata[_META_KEY])
+            df = table.to_pandas()
+            cols = meta['columns']
+            df.columns = pd.MultiIndex.from_tuples([tuple(c) for c in cols]) if cols and isinstance(cols[0], list) else pd.Index(cols)
+            df.attrs.update(meta.get('attrs', {}))
+        except Exception as e:
+            logger.warning("snapshot load failed: %s (%s)", os.path.basename(path), e)
+            return None
+        return SheetSnapshot(df=df, version=meta['version'], etag=meta['etag'], last_modified=meta['last_modified'], digest=meta['digest'])
+
+    def save(self, url, header, snap):
+        if not self.enabled or snap.df is None: return
+        path = self._path(url, header)
+        df = snap.df
+        meta = {
+            'header': header, 'version': snap.version,
+            'etag': snap.etag, 'last_modified': snap.last_modified, 'digest': snap.digest,
+            'columns': [list(c) if isinstance(c, tuple) else c for c in df.columns],
+            'attrs': df.attrs,
+        }
+        try:
+            # 多级表头/重复列名无法直接作为 Arrow 字段名，按位置命名，真实列名放在元数据里
+            flat = df.set_axis([f"c{i}" for i in range(df.shape[1])], axis=1)
+            table = pa.Table.from_pandas(flat, preserve_index=False)
+            # 保留 pandas 自带的 dtype 元数据，恢复时才能还原分类列/可空整数列
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta, ensure_ascii=False)})
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning("snapshot save failed: %s (%s)", os.path.basename(path), e)
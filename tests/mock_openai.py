@@ -0,0 +1,97 @@
+"""
+本地 OpenAI 兼容替身服务 (/chat/completions，普通与 SSE 流式两种响应)
+
+- fail[提示词片段] = [状态码, ...]：命中该片段的请求依次先返回这些状态码，用完后正常返回
+- delay / chunk_delay：整体响应延迟、流式片段间隔 (秒)
+- requests：收到的请求 [(时间, 提示词, 返回状态码)]
+回答文本固定为 "建议：" + 提示词末尾 20 个字符。
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def answer(prompt):
+    return "建议：" + prompt[-20:]
+
+
+class MockAI:
+    def __init__(self):
+        self.fail = {}
+        self.delay = 0.0
+        self.chunk_delay = 0.0
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def calls(self, status=None):
+        with self._lock:
+            return [r for r in self.requests if status is None or r[2] == status]
+
+    def _status(self, prompt):
+        with self._lock:
+            for part, codes in self.fail.items():
+                if part in prompt and codes:
+                    return codes.pop(0)
+        return 200
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                prompt = body['messages'][-1]['content']
+                status = mock._status(prompt)
+                with mock._lock:
+                    mock.requests.append((time.monotonic(), prompt, status))
+                if status != 200:
+                    self._json(status, {'error': {'message': f"mock {status}", 'type': 'mock'}})
+                    return
+                time.sleep(mock.delay)
+                text = answer(prompt)
+                if body.get('stream'):
+                    self._stream(text)
+                else:
+                    self._json(200, {'id': 'mock', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+                                     'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                                     'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}})
+
+            def _json(self, status, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, text):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                def chunk(data):
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                for i in range(0, len(text), 4):
+                    event = {'id': 'mock', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'mock',
+                             'choices': [{'index': 0, 'delta': {'content': text[i:i + 4]}, 'finish_reason': None}]}
+                    chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    time.sleep(mock.chunk_delay)
+                chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,119 @@
+"""
+ai_advisor 对着本地 OpenAI 兼容替身服务的测试：缓存去重、跨实例持久化、限流/5xx 指数退避重试、并发流式请求共享上游
+"""
+import threading
+import time
+
+import pytest
+
+import ai_advisor
+from tests.mock_openai import MockAI, answer
+
+
+@pytest.fixture
+def mock_ai():
+    mock = MockAI()
+    yield mock
+    mock.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ai_advisor.AdviceCache(str(tmp_path / "advice.sqlite3"))
+
+
+def prompts(n_unique, repeat):
+    return [(ai_advisor.STUDENT_SYSTEM, ai_advisor.student_prompt("⚡ 物理", f"知识点{i}", "无")) for i in range(n_unique)] * repeat
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "sub" / "advice.sqlite3")
+    key = ai_advisor.cache_key("s", "p")
+    ai_advisor.AdviceCache(path).put(key, "建议")
+    assert ai_advisor.AdviceCache(path).get(key) == "建议"
+    assert ai_advisor.AdviceCache(path).get(ai_advisor.cache_key("s", "p", model="other")) is None
+
+
+def test_pregenerate_dedups_and_skips_cached(mock_ai, cache):
+    summary = ai_advisor.pregenerate("k", mock_ai.base_url, cache, prompts(5, 4), concurrency=3)
+    assert summary == {'total': 20, 'unique': 5, 'cached': 0, 'generated': 5, 'failed': 0}
+    assert len(mock_ai.calls()) == 5
+    system, prompt = prompts(1, 1)[0]
+    assert cache.get(ai_advisor.cache_key(system, prompt)) == answer(prompt)
+
+    summary = ai_advisor.pregenerate("k", mock_ai.base_url, cache, prompts(6, 2))
+    assert summary == {'total': 12, 'unique': 6, 'cached': 5, 'generated': 1, 'failed': 0}
+    assert len(mock_ai.calls()) == 6
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_pregenerate_retries_rate_limits_and_server_errors(mock_ai, cache, status):
+    mock_ai.fail["知识点0"] = [status, status]
+    summary = ai_advisor.pregenerate("k", mock_ai.base_url, cache, prompts(2, 1), retries=3, backoff=0.01)
+    assert summary['generated'] == 2 and summary['failed'] == 0
+    assert len(mock_ai.calls(status)) == 2 and len(mock_ai.calls(200)) == 2
+
+
+def test_pregenerate_gives_up_after_retries(mock_ai, cache):
+    mock_ai.fail["知识点0"] = [500] * 10
+    summary = ai_advisor.pregenerate("k", mock_ai.base_url, cache, prompts(2, 1), retries=2, backoff=0.01)
+    assert summary['generated'] == 1 and summary['failed'] == 1
+    assert len(mock_ai.calls(500)) == 3
+    system, prompt = prompts(1, 1)[0]
+    assert cache.get(ai_advisor.cache_key(system, prompt)) is None
+
+
+def test_pregenerate_does_not_retry_client_errors(mock_ai, cache):
+    mock_ai.fail["知识点0"] = [400]
+    summary = ai_advisor.pregenerate("k", mock_ai.base_url, cache, prompts(1, 1), retries=3, backoff=0.01)
+    assert summary['failed'] == 1 and len(mock_ai.calls()) == 1
+
+
+def test_backoff_releases_concurrency_slot(mock_ai, cache):
+    # 并发度 1：第一条被限流退避时，第二条应该先发出去，而不是等第一条退避完
+    mock_ai.fail["知识点0"] = [429]
+    summary = ai_advisor.pregenerate("k", mock_ai.base_url, cache, prompts(2, 1), concurrency=1, retries=1, backoff=0.3)
+    assert summary['generated'] == 2
+    order = [(prompt.split("薄弱：")[1][:4], status) for _, prompt, status in mock_ai.calls()]
+    assert order == [("知识点0", 429), ("知识点1", 200), ("知识点0", 200)]
+
+
+def test_concurrent_streams_share_one_upstream(mock_ai, cache):
+    mock_ai.chunk_delay = 0.02
+    client = ai_advisor.make_client("k", mock_ai.base_url)
+    system, prompt = prompts(1, 1)[0]
+    results = []
+    threads = [threading.Thread(target=lambda: results.append("".join(ai_advisor.stream_complete(client, cache, system, prompt)))) for _ in range(6)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert results == [answer(prompt)] * 6
+    assert len(mock_ai.calls()) == 1
+    assert "".join(ai_advisor.stream_complete(client, cache, system, prompt)) == answer(prompt)
+    assert len(mock_ai.calls()) == 1
+
+
+class _SlowMissCache:
+    """第二次起的 get 读完后再停顿一会儿，模拟查缓存与登记流之间被其他线程插入"""
+    def __init__(self, cache, pause):
+        self.cache, self.pause, self.gets = cache, pause, 0
+
+    def get(self, key):
+        text = self.cache.get(key)
+        self.gets += 1
+        if self.gets > 1: time.sleep(self.pause)
+        return text
+
+    def put(self, key, text):
+        self.cache.put(key, text)
+
+
+def test_stream_finishing_during_cache_miss_is_not_restarted(mock_ai, cache):
+    client = ai_advisor.make_client("k", mock_ai.base_url)
+    system, prompt = prompts(1, 1)[0]
+    slow = _SlowMissCache(cache, pause=0.5)
+    first = ai_advisor.stream_complete(client, slow, system, prompt)
+    next(first)  # 第一位读者发起上游流并读到首个片段
+    # 第二位读者查缓存未命中后停顿期间，上游流读完并写入缓存
+    assert "".join(ai_advisor.stream_complete(client, slow, system, prompt)) == answer(prompt)
+    "".join(first)
+    assert len(mock_ai.calls()) == 1
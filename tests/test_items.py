@@ -0,0 +1,50 @@
+"""analytics.items 的试题质量分析，对照逐题的朴素算法"""
+import io
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from benchmarks.synthetic import detail_sheet, make_cohort
+
+
+def detail_with_absences(n=400, n_questions=12, seed=3):
+    csv = detail_sheet(make_cohort(n, 6, seed), n_questions, 5, seed)
+    df = analytics.parse_sheet(io.BytesIO(csv.encode('utf-8')), [0, 1, 2])
+    rng = np.random.default_rng(seed)
+    for pos, _, _ in analytics.question_columns(df):
+        col = df.iloc[:, pos].astype(float).to_numpy().copy()
+        col[rng.random(n) < 0.1] = np.nan
+        df.isetitem(pos, col)
+    return df
+
+
+def test_item_statistics_match_per_item_reference():
+    df = detail_with_absences()
+    questions = analytics.question_columns(df)
+    stats = analytics.item_analysis(df)
+    x = np.column_stack([df.iloc[:, q[0]].astype(float).to_numpy() for q in questions])
+    full = np.array([q[2] for q in questions], dtype=float)
+    zeroed = np.nan_to_num(x)
+    total = zeroed.sum(axis=1)
+    for j in range(len(questions)):
+        col = x[:, j]
+        answered = ~np.isnan(col)
+        assert stats['items']['作答人数'].iloc[j] == answered.sum()
+        assert np.isclose(stats['items']['难度'].iloc[j], round(col[answered].mean() / full[j], 3))
+        r = np.corrcoef(zeroed[:, j], total - zeroed[:, j])[0, 1]
+        assert np.isclose(stats['items']['点二列相关'].iloc[j], round(r, 3))
+        bands = [np.sum(answered & (col <= 0)), np.sum(answered & (col > 0) & (col < full[j] / 2)),
+                 np.sum(answered & (col >= full[j] / 2) & (col < full[j])), np.sum(answered & (col >= full[j])), np.sum(~answered)]
+        assert np.allclose(stats['distribution'].iloc[j, 1:].astype(float), np.round(np.array(bands) / len(col) * 100, 1))
+
+
+def test_class_difficulty_ignores_absences():
+    df = detail_with_absences()
+    questions = analytics.question_columns(df)
+    stats = analytics.item_analysis(df)
+    cls = df.iloc[:, 0].astype(str).str.strip()
+    for i, c in enumerate(stats['classes']):
+        for j, (pos, _, full) in enumerate(questions):
+            expected = df.iloc[:, pos].astype(float)[cls == c].mean() / full
+            assert np.isclose(stats['class_difficulty'][i, j], round(expected, 3))
@@ -0,0 +1,34 @@
+"""metrics 的汇总、缓存计数与 Prometheus 导出"""
+import urllib.request
+
+import metrics
+
+
+def test_summary_and_prometheus_text():
+    reg = metrics.Registry()
+    for s in (0.1, 0.2, 0.3):
+        reg.observe('sheet.parse', s)
+    reg.cache_event('score_aggregates', hit=True)
+    reg.cache_event('score_aggregates', hit=False)
+    reg.gauge('sheet_memory_bytes', lambda: {'成绩总表·"物理"': 1024})
+    (row,) = reg.summary()
+    assert row['stage'] == 'sheet.parse' and row['count'] == 3 and row['p50_ms'] == 200.0 and row['max_ms'] == 300.0
+    assert reg.cache_stats() == [{'cache': 'score_aggregates', 'hit': 1, 'miss': 1, 'hit_rate': 0.5}]
+    text = reg.prometheus()
+    assert 'yhxx_stage_seconds_sum{stage="sheet.parse"} 0.600000' in text
+    assert 'yhxx_cache_requests_total{cache="score_aggregates",result="miss"} 1' in text
+    assert 'yhxx_sheet_memory_bytes{key="成绩总表·\\"物理\\""} 1024' in text
+
+
+def test_endpoint_listens_on_loopback_by_default():
+    reg = metrics.Registry()
+    reg.observe('load_data', 0.01)
+    server = reg.serve(0)
+    try:
+        host, port = server.server_address[:2]
+        assert host == '127.0.0.1'
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode('utf-8')
+        assert 'stage="load_data"' in body
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,14 @@
+"""analytics.ranks 的名次索引"""
+import pandas as pd
+
+import analytics
+
+
+def test_rank_and_id_columns_are_not_ranked_as_subjects():
+    df = analytics.apply_score_schema(pd.DataFrame({
+        '序号': ['1', '2', '3'], '姓名': ['甲', '乙', '丙'], '考号': ['1', '2', '3'], '班级': ['1班', '1班', '2班'],
+        '数学': ['90', '80', '70'], '总分': ['300', '280', '260'],
+        '排名': ['1', '2', '3'], '班级排名': ['1', '2', '1'], '年级排名': ['1', '2', '3']}))
+    index = analytics.RankIndex(df)
+    assert index.columns == ['总分', '数学']
+    assert index.standing(df.iloc[0]) == [('总分', 300, 1, 1, 66.7), ('数学', 90, 1, 1, 66.7)]
@@ -0,0 +1,16 @@
+"""report_export 的单个学生报告渲染"""
+import io
+import re
+
+import analytics
+import report_export
+from benchmarks.synthetic import make_cohort, score_sheet
+
+
+def test_report_loads_the_plotly_js_matching_the_installed_plotly():
+    from plotly.offline import get_plotlyjs_version
+    df = analytics.parse_sheet(io.BytesIO(score_sheet(make_cohort(30, 3, 0)).to_csv(index=False).encode('utf-8')))
+    payload = report_export.build_payloads(df, '物理方向', analytics.RankIndex(df))[0]
+    page = report_export.render_report(payload)
+    assert re.findall(r'<script src="([^"]+)"', page) == [f"https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"]
+    assert payload['name'] in page
@@ -0,0 +1,18 @@
+"""analytics.scores 的看板聚合"""
+import pandas as pd
+
+import analytics
+
+
+def score_sheet():
+    return analytics.apply_score_schema(pd.DataFrame({
+        '序号': ['1', '2', '3'], '姓名': ['甲', '乙', '丙'], '考号': ['1', '2', '3'], '班级': ['1班', '1班', '2班'],
+        '物理': ['90', '80', ''], '数学': ['70', '60', '50'], '总分': ['160', '140', '50'], '备注': ['转学', '', '请假']}))
+
+
+def test_class_avg_only_covers_score_columns():
+    agg = analytics.score_aggregates(score_sheet())
+    assert agg['subjects'] == ['数学']
+    assert list(agg['class_avg'].columns) == ['班级', '物理', '数学', '总分']
+    assert agg['class_avg']['物理'].iloc[0] == 85.0 and pd.isna(agg['class_avg']['物理'].iloc[1])
+    assert agg['class_avg']['总分'].tolist() == [150.0, 50.0]
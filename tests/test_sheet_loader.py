@@ -0,0 +1,193 @@
+"""
+SheetLoader 对着本地 HTTP 替身服务的行为测试：条件请求 / 304、内容哈希不变不重解析、并发刷新合并、版本号递增、失败保留旧数据
+"""
+import functools
+import hashlib
+import http.server
+import logging
+import threading
+import time
+
+import pytest
+
+from sheet_loader import SheetLoader, read_csv
+
+CSV_A = "姓名,考号,总分\n张三,001,600\n李四,002,580\n".encode('utf-8')
+CSV_B = "姓名,考号,总分\n张三,001,610\n李四,002,590\n王五,003,570\n".encode('utf-8')
+
+
+class Origin:
+    """替身服务的可变状态：当前内容、是否发 ETag、人为延迟/故障，以及收到的请求"""
+    def __init__(self):
+        self.body = CSV_A
+        self.etag = True
+        self.delay = 0.0
+        self.status = None
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def __init__(self, origin, *args, **kwargs):
+        self.origin = origin
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        o = self.origin
+        with o.lock:
+            o.requests.append(dict(self.headers))
+        time.sleep(o.delay)
+        if o.status:
+            self.send_error(o.status)
+            return
+        tag = '"' + hashlib.md5(o.body).hexdigest() + '"'
+        if o.etag and self.headers.get('If-None-Match') == tag:
+            self.send_response(304)
+            self.send_header('ETag', tag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if o.etag: self.send_header('ETag', tag)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Length', str(len(o.body)))
+        self.end_headers()
+        self.wfile.write(o.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def origin():
+    o = Origin()
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_Handler, o))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    o.url = f"http://127.0.0.1:{server.server_address[1]}/sheet.csv"
+    yield o
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def parses():
+    """记录解析次数的 read_csv"""
+    calls = []
+
+    def parse(source, header=0):
+        calls.append(header)
+        return read_csv(source, header)
+    parse.calls = calls
+    return parse
+
+
+def outcome(loader, url):
+    """立即重新校验一次，返回预热报告里的该表结果"""
+    return loader.prefetch({'sheet': (url, 0)}).result(timeout=10)[0]
+
+
+def test_first_get_blocks_then_serves_from_memory(origin, parses):
+    loader = SheetLoader(ttl=600, parse=parses)
+    df, version = loader.get(origin.url)
+    assert version == 1 and len(df) == 2
+    df2, version2 = loader.get(origin.url)
+    assert version2 == 1 and df2['总分'].tolist() == [600, 580]
+    assert len(origin.requests) == 1 and len(parses.calls) == 1
+
+
+def test_304_skips_parse(origin, parses):
+    loader = SheetLoader(ttl=0, parse=parses)
+    loader.get(origin.url)
+    r = outcome(loader, origin.url)
+    assert r['outcome'] == 'not_modified' and r['version'] == 1
+    assert origin.requests[-1].get('If-None-Match') == '"' + hashlib.md5(CSV_A).hexdigest() + '"'
+    assert len(parses.calls) == 1
+
+
+def test_same_hash_skips_parse(origin, parses):
+    origin.etag = False
+    loader = SheetLoader(ttl=0, parse=parses)
+    loader.get(origin.url)
+    r = outcome(loader, origin.url)
+    assert r['outcome'] == 'unchanged' and r['version'] == 1
+    assert 'If-None-Match' not in origin.requests[-1]
+    assert len(parses.calls) == 1
+
+
+def test_changed_content_bumps_version(origin, parses):
+    loader = SheetLoader(ttl=0, parse=parses)
+    loader.get(origin.url)
+    origin.body = CSV_B
+    r = outcome(loader, origin.url)
+    assert r['outcome'] == 'downloaded' and r['version'] == 2
+    df, version = loader.get(origin.url)
+    assert version == 2 and df['姓名'].tolist() == ['张三', '李四', '王五']
+    assert len(parses.calls) == 2
+
+
+def test_stale_get_returns_old_data_without_waiting(origin):
+    loader = SheetLoader(ttl=0)
+    loader.get(origin.url)
+    origin.body, origin.delay = CSV_B, 0.5
+    t0 = time.monotonic()
+    df, version = loader.get(origin.url)
+    assert time.monotonic() - t0 < 0.3
+    assert version == 1 and len(df) == 2
+    loader.refresh(origin.url).result(timeout=10)
+    assert loader.get(origin.url)[1] == 2
+
+
+def test_concurrent_refreshes_coalesce(origin):
+    loader = SheetLoader(ttl=0, max_workers=4)
+    loader.get(origin.url)
+    origin.body, origin.delay = CSV_B, 0.3
+    before = len(origin.requests)
+    futures = [loader.refresh(origin.url) for _ in range(8)]
+    threads = [threading.Thread(target=loader.get, args=(origin.url,)) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    for f in futures: f.result(timeout=10)
+    assert len({id(f) for f in futures}) == 1
+    assert len(origin.requests) - before == 1
+    assert loader.version(origin.url) == 2
+
+
+def test_failure_keeps_last_good_data(origin):
+    loader = SheetLoader(ttl=0)
+    loader.get(origin.url)
+    origin.status = 500
+    r = outcome(loader, origin.url)
+    assert r['outcome'] == 'failed' and r['ok'] and r['error']
+    df, version = loader.get(origin.url)
+    assert version == 1 and df['总分'].tolist() == [600, 580]
+
+
+def test_first_load_failure_returns_none(origin):
+    origin.status = 404
+    df, version = SheetLoader(ttl=0).get(origin.url)
+    assert df is None and version == 0
+
+
+def test_views_do_not_write_through(origin):
+    loader = SheetLoader()
+    df, _ = loader.get(origin.url)
+    df['总分'] = 0
+    assert loader.get(origin.url)[0]['总分'].tolist() == [600, 580]
+
+
+def test_prefetch_logs_failure_once(origin, caplog):
+    origin.status = 500
+    with caplog.at_level(logging.INFO, logger='sheet_loader'):
+        r = SheetLoader(ttl=0).prefetch({'成绩总表': (origin.url, 0)}).result(timeout=10)[0]
+    assert not r['ok']
+    messages = [rec.getMessage() for rec in caplog.records if rec.getMessage().startswith('prefetch')]
+    assert len(messages) == 1 and 'failed' in messages[0]
+
+
+def test_footprint_and_logs_do_not_expose_urls(origin, caplog):
+    loader = SheetLoader(ttl=0)
+    loader.get(origin.url)
+    assert list(loader.footprint({'成绩总表·物理方向': (origin.url, 0), '未配置': ('', 0)})) == ['成绩总表·物理方向']
+    origin.status = 500
+    with caplog.at_level(logging.INFO, logger='sheet_loader'):
+        loader.refresh(origin.url).result(timeout=10)
+    assert caplog.records and not any(origin.url in rec.getMessage() or '127.0.0.1' in rec.getMessage() for rec in caplog.records)
@@ -0,0 +1,20 @@
+"""snapshot_store 的 Arrow 快照读写"""
+import pandas as pd
+import pytest
+
+from sheet_loader import SheetSnapshot
+from snapshot_store import SnapshotStore
+
+pytest.importorskip('pyarrow')
+
+URL = "https://docs.example.com/spreadsheets/d/e/SECRET-TOKEN/pub?output=csv"
+
+
+def test_round_trip_keeps_url_out_of_file(tmp_path):
+    store = SnapshotStore(str(tmp_path), tag='t')
+    df = pd.DataFrame({'姓名': ['甲', '乙'], '总分': [600.0, 580.0]})
+    store.save(URL, 0, SheetSnapshot(df=df, version=3, etag='"e"', digest='d'))
+    snap = store.load(URL, 0)
+    assert snap.version == 3 and snap.etag == '"e"' and snap.df['总分'].tolist() == [600.0, 580.0]
+    for path in tmp_path.iterdir():
+        assert b'SECRET-TOKEN' not in path.read_bytes()